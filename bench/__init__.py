@@ -0,0 +1,13 @@
+"""Benchmark harness for the CSAK tools and console.
+
+Run from the repository root:
+
+    python -m bench                       # every benchmark, compared to bench/baseline.json
+    python -m bench --only 'defanger*'    # a subset
+    python -m bench --save-baseline       # record the current numbers as the baseline
+
+Each benchmark generates its own synthetic input (or serves a recorded crt.sh
+payload locally), runs the tool as a child process several times and reports
+wall time, CPU time, peak RSS and throughput. Results are written as JSON and
+compared against the baseline so regressions show up as a non-zero exit.
+"""
@@ -0,0 +1,176 @@
+"""Synthetic inputs for the benchmarks and a local stand-in for crt.sh.
+
+Generators are seeded so every run (and every machine) benchmarks the same
+bytes; they return how much work the file represents so throughput can be
+reported in meaningful units.
+"""
+
+import json
+import os
+import random
+import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "session login failed accepted connection from user request response error warning "
+    "timeout proxy upstream forwarded blocked allowed policy rule alert host client server"
+).split()
+TLDS = ("com", "net", "org", "io", "co.uk", "de")
+PACKAGES = ("requests", "yaml", "numpy", "cmd2", "colorama", "bs4", "PIL", "cv2")
+STDLIB = ("os", "sys", "json", "re", "csv", "socket", "time", "argparse", "collections")
+
+
+def _ip(rng):
+    return ".".join(str(rng.randint(1, 254)) for _ in range(4))
+
+
+def _domain(rng):
+    return f"{rng.choice(WORDS)}{rng.randint(0, 999)}.{rng.choice(TLDS)}"
+
+
+def write_log(path, lines, seed=1):
+    """Write a proxy/auth style log where most lines carry IPs, URLs, emails or domains.
+
+    Returns the file size in bytes.
+    """
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        for i in range(lines):
+            words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 10)))
+            kind = i % 5
+            if kind == 0:
+                artifact = f"src={_ip(rng)} dst={_ip(rng)}"
+            elif kind == 1:
+                artifact = f"url=https://{_domain(rng)}/path/{rng.randint(0, 10**6)}?q={rng.choice(WORDS)}"
+            elif kind == 2:
+                artifact = f"user={rng.choice(WORDS)}.{rng.choice(WORDS)}@{_domain(rng)}"
+            elif kind == 3:
+                artifact = f"host={_domain(rng)}"
+            else:
+                artifact = f"pid={rng.randint(1, 65535)}"
+            f.write(f"2024-05-{i % 28 + 1:02d}T12:{i % 60:02d}:00Z {words} {artifact}\n")
+    return os.path.getsize(path)
+
+
+def write_csv(path, rows, cols, seed=1):
+    """Write a CSV with a header of c0..cN and a mix of ints, floats, IPs and text.
+
+    Returns the file size in bytes.
+    """
+    rng = random.Random(seed)
+    kinds = [c % 4 for c in range(cols)]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(",".join(f"c{c}" for c in range(cols)) + "\n")
+        for _ in range(rows):
+            values = []
+            for kind in kinds:
+                if kind == 0:
+                    values.append(str(rng.randint(0, 10**6)))
+                elif kind == 1:
+                    values.append(f"{rng.random() * 1000:.3f}")
+                elif kind == 2:
+                    values.append(_ip(rng))
+                else:
+                    values.append(f'"{rng.choice(WORDS)}, {rng.choice(WORDS)}"')
+            f.write(",".join(values) + "\n")
+    return os.path.getsize(path)
+
+
+def write_source_tree(root, packages, modules, seed=1):
+    """Create `packages` packages of `modules` modules each, plus a virtualenv that must be skipped.
+
+    Returns the number of .py files the scanner should visit.
+    """
+    rng = random.Random(seed)
+    shutil.rmtree(root, ignore_errors=True)
+    for p in range(packages):
+        pkg = os.path.join(root, f"pkg{p}")
+        os.makedirs(pkg)
+        with open(os.path.join(pkg, "__init__.py"), "w") as f:
+            f.write('"""Generated package."""\n')
+        for m in range(modules):
+            names = rng.sample(STDLIB, 3) + rng.sample(PACKAGES, 2)
+            body = "\n".join(f"import {n}" for n in names)
+            body += f"\nfrom pkg{rng.randrange(packages)} import mod{rng.randrange(modules)}\n"
+            for fn in range(20):
+                body += f"\n\ndef func{fn}(a, b=1):\n    x = [i * b for i in range(a)]\n    return sum(x) + {fn}\n"
+            with open(os.path.join(pkg, f"mod{m}.py"), "w") as f:
+                f.write(body)
+    with open(os.path.join(root, "broken.py"), "w") as f:
+        f.write("def broken(:\n")
+    venv = os.path.join(root, ".venv", "lib", "site-packages")
+    os.makedirs(venv)
+    with open(os.path.join(root, ".venv", "pyvenv.cfg"), "w") as f:
+        f.write("home = /usr/bin\n")
+    with open(os.path.join(venv, "vendored.py"), "w") as f:
+        f.write("import should_not_be_seen\n")
+    return packages * (modules + 1) + 1
+
+
+def write_crtsh_payload(path, entries, domain="example.com", seed=1):
+    """Write a crt.sh-shaped JSON array of certificate entries.
+
+    Returns the number of entries.
+    """
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for i in range(entries):
+            names = "\n".join(f"{rng.choice(WORDS)}{rng.randint(0, entries // 10)}.{domain}"
+                              for _ in range(rng.randint(1, 3)))
+            stamp = f"20{rng.randint(15, 24)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00"
+            entry = {
+                "issuer_ca_id": 183267,
+                "issuer_name": "C=US, O=Let's Encrypt, CN=R3",
+                "common_name": names.split("\n")[0],
+                "name_value": names,
+                "id": 10**9 + i,
+                "entry_timestamp": stamp + ".123",
+                "not_before": stamp,
+                "not_after": stamp.replace("20", "21", 1),
+                "serial_number": f"{rng.getrandbits(64):x}",
+                "result_count": 3,
+            }
+            f.write(("," if i else "") + json.dumps(entry))
+        f.write("]")
+    return entries
+
+
+class CrtShServer:
+    """Serve a recorded crt.sh JSON payload on localhost for any query.
+
+    Used as a context manager; ``url`` is the base URL to pass to
+    certcrawl's -base-url. The payload is streamed from disk in chunks.
+    """
+
+    def __init__(self, payload_path):
+        self.payload_path = payload_path
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.requests += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(os.path.getsize(server.payload_path)))
+                self.end_headers()
+                with open(server.payload_path, "rb") as f:
+                    shutil.copyfileobj(f, self.wfile, 1 << 16)
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}/"
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
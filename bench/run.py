@@ -0,0 +1,447 @@
+"""Benchmark definitions, measurement and baseline comparison.
+
+Every benchmark is a function registered with ``@benchmark``. It prepares its
+input under the run's work directory and returns a spec:
+
+    argv    command to time (run from the repository root)
+    work    amount of work done per run, in the benchmark's unit
+    stdin   optional file fed to the command
+    prime   optional command run once beforehand to warm caches
+    before  optional callable run before every timed run
+
+or raises ``Skip`` when the benchmark cannot run on this machine. Children
+are reaped with ``os.wait4`` so CPU time and peak RSS cover the tool and
+every process it waited for (pool workers included). Linux also charges the
+harness's own RSS at spawn time to each child, so peak RSS never reads below
+that floor (about 20 MB).
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from importlib.util import find_spec
+
+from bench import data
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(ROOT, "bench", "baseline.json")
+RESULTS_PATH = os.path.join(ROOT, "bench", "results.json")
+
+# a metric regresses when it grows by more than the threshold AND by more
+# than its noise floor (tiny absolute changes are timer/allocator jitter)
+COMPARED = {"wall_s": 0.05, "cpu_s": 0.05, "maxrss_mb": 2.0}
+THRESHOLD = 0.15
+
+CASES = []
+
+
+class Skip(Exception):
+    """Raised by a benchmark that cannot run here; the message says why"""
+
+
+def benchmark(name, unit=None):
+    """Register a benchmark; unit names the work measure (None reports latency only)"""
+    def register(fn):
+        CASES.append((name, unit, fn))
+        return fn
+    return register
+
+
+def tool(module, name):
+    return os.path.join(ROOT, "modules", module, f"{name}.py")
+
+
+class Context:
+    """Shared state for one harness run: work directory, scale and generated inputs"""
+
+    def __init__(self, workdir, scale):
+        self.workdir = workdir
+        self.scale = scale
+        self.env = dict(os.environ, CSAK_HOME=os.path.join(workdir, "home"))
+        self._inputs = {}
+        self._servers = []
+
+    def path(self, *parts):
+        return os.path.join(self.workdir, *parts)
+
+    def n(self, count):
+        """Scale a workload size, never below 1"""
+        return max(1, int(count * self.scale))
+
+    def input(self, key, make):
+        """Generate an input once per run; make(path) returns its work measure"""
+        if key not in self._inputs:
+            path = self.path(key)
+            self._inputs[key] = (path, make(path))
+        return self._inputs[key]
+
+    def crtsh(self, payload_path):
+        """Start (once) a local crt.sh stand-in serving payload_path and return its URL"""
+        for server in self._servers:
+            if server.payload_path == payload_path:
+                return server.url
+        server = data.CrtShServer(payload_path).__enter__()
+        self._servers.append(server)
+        return server.url
+
+    def close(self):
+        for server in self._servers:
+            server.__exit__(None, None, None)
+
+
+def measure(argv, env, stdin=None):
+    """Run a command once and return its wall time, CPU time, peak RSS and exit code"""
+    with open(stdin or os.devnull, "rb") as inp, tempfile.TemporaryFile() as err:
+        start = time.perf_counter()
+        proc = subprocess.Popen(argv, cwd=ROOT, env=env, stdin=inp,
+                                stdout=subprocess.DEVNULL, stderr=err)
+        if hasattr(os, "wait4"):
+            _, status, usage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            wall = time.perf_counter() - start
+            cpu = usage.ru_utime + usage.ru_stime
+            # ru_maxrss is KiB on Linux and bytes on macOS
+            maxrss = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+        else:
+            proc.wait()
+            wall = time.perf_counter() - start
+            cpu = maxrss = None
+        err.seek(0)
+        stderr = err.read().decode("utf-8", "replace")
+    return {"wall_s": wall, "cpu_s": cpu, "maxrss_mb": maxrss,
+            "returncode": proc.returncode, "stderr": stderr}
+
+
+def run_case(name, unit, fn, ctx, repeat):
+    """Run one benchmark `repeat` times and summarise it"""
+    try:
+        spec = fn(ctx)
+    except Skip as e:
+        return {"status": "skipped", "reason": str(e)}
+    if spec.get("prime"):
+        measure(spec["prime"], ctx.env, spec.get("stdin"))
+    runs = []
+    for _ in range(repeat):
+        if spec.get("before"):
+            spec["before"]()
+        run = measure(spec["argv"], ctx.env, spec.get("stdin"))
+        runs.append(run)
+        if run["returncode"] != 0:
+            return {"status": "failed", "returncode": run["returncode"],
+                    "stderr": run["stderr"][-2000:]}
+    wall = statistics.median(r["wall_s"] for r in runs)
+    result = {
+        "status": "ok",
+        "runs": repeat,
+        "wall_s": round(wall, 4),
+        "wall_min_s": round(min(r["wall_s"] for r in runs), 4),
+        "cpu_s": None,
+        "maxrss_mb": None,
+        "unit": unit,
+        "work": spec.get("work"),
+    }
+    if runs[0]["cpu_s"] is not None:
+        result["cpu_s"] = round(statistics.median(r["cpu_s"] for r in runs), 4)
+        result["maxrss_mb"] = round(max(r["maxrss_mb"] for r in runs), 1)
+    if unit and spec.get("work"):
+        result["throughput"] = round(spec["work"] / wall, 2)
+    return result
+
+
+# ---------------------------------------------------------------------------
+# benchmarks
+# ---------------------------------------------------------------------------
+
+MB = 1024 * 1024
+
+
+def _log(ctx):
+    path, size = ctx.input("access.log", lambda p: data.write_log(p, ctx.n(200_000)))
+    return path, size / MB
+
+
+@benchmark("defanger-seq", "MB")
+def bench_defanger_seq(ctx):
+    path, mb = _log(ctx)
+    return {"argv": [sys.executable, tool("Administration", "defanger"), "-f", path,
+                     "-o", ctx.path("defanger.tsv"), "-q", "-j", "1"],
+            "work": mb}
+
+
+@benchmark("defanger-parallel", "MB")
+def bench_defanger_parallel(ctx):
+    jobs = os.cpu_count() or 1
+    if jobs < 2:
+        raise Skip("needs more than one CPU")
+    path, mb = _log(ctx)
+    return {"argv": [sys.executable, tool("Administration", "defanger"), "-f", path,
+                     "-o", ctx.path("defanger.tsv"), "-q", "-j", str(jobs), "--chunk-size", "4"],
+            "work": mb}
+
+
+@benchmark("defanger-rewrite", "MB")
+def bench_defanger_rewrite(ctx):
+    path, mb = _log(ctx)
+    return {"argv": [sys.executable, tool("Administration", "defanger"), "-f", path,
+                     "-w", ctx.path("defanged.log.gz"), "-q", "-j", "1"],
+            "work": mb}
+
+
+@benchmark("csv2array-tall", "MB")
+def bench_csv_tall(ctx):
+    path, size = ctx.input("tall.csv", lambda p: data.write_csv(p, ctx.n(500_000), 6))
+    return {"argv": [sys.executable, tool("Data", "csv2array"), path, "-column", "c2",
+                     "-output", ctx.path("tall.kql")],
+            "work": size / MB}
+
+
+@benchmark("csv2array-wide", "MB")
+def bench_csv_wide(ctx):
+    path, size = ctx.input("wide.csv", lambda p: data.write_csv(p, ctx.n(5_000), 300))
+    return {"argv": [sys.executable, tool("Data", "csv2array"), path, "-column", "c0", "c150", "c299",
+                     "-output", ctx.path("wide.kql")],
+            "work": size / MB}
+
+
+def _tree(ctx):
+    return ctx.input("tree", lambda p: data.write_source_tree(p, ctx.n(40), 25))
+
+
+@benchmark("modulescan-cold", "files")
+def bench_modulescan_cold(ctx):
+    path, files = _tree(ctx)
+    return {"argv": [sys.executable, tool("Administration", "modulescan"), "--directory", path,
+                     "--output", ctx.path("requirements.txt"), "--no-cache"],
+            "work": files}
+
+
+@benchmark("modulescan-warm", "files")
+def bench_modulescan_warm(ctx):
+    path, files = _tree(ctx)
+    argv = [sys.executable, tool("Administration", "modulescan"), "--directory", path,
+            "--output", ctx.path("requirements.txt"), "--cache", ctx.path("modulescan.json")]
+    return {"argv": argv, "prime": argv, "work": files}
+
+
+def _crtsh(ctx):
+    if find_spec("requests") is None:
+        raise Skip("requests is not installed")
+    path, entries = ctx.input("crtsh.json", lambda p: data.write_crtsh_payload(p, ctx.n(100_000)))
+    return ctx.crtsh(path), entries
+
+
+@benchmark("certcrawl-download", "certs")
+def bench_certcrawl_download(ctx):
+    url, entries = _crtsh(ctx)
+    return {"argv": [sys.executable, tool("PKI", "certcrawl"), "-domain", "%.example.com",
+                     "-output", ctx.path("certs.csv"), "-base-url", url, "-no-cache"],
+            "work": entries}
+
+
+@benchmark("certcrawl-cached", "certs")
+def bench_certcrawl_cached(ctx):
+    url, entries = _crtsh(ctx)
+    argv = [sys.executable, tool("PKI", "certcrawl"), "-domain", "%.example.com",
+            "-output", ctx.path("certs.csv"), "-base-url", url, "-cache-db", ctx.path("certcrawl.db")]
+    return {"argv": argv + ["-offline"], "prime": argv + ["-refresh"], "work": entries}
+
+
+def _icmp_socket_available():
+    for kind in (socket.SOCK_DGRAM, socket.SOCK_RAW):
+        try:
+            socket.socket(socket.AF_INET, kind, socket.IPPROTO_ICMP).close()
+            return True
+        except (OSError, AttributeError):
+            pass
+    return False
+
+
+@benchmark("icmp-socket", "hosts")
+def bench_icmp_socket(ctx):
+    if not _icmp_socket_available():
+        raise Skip("ICMP sockets need root or net.ipv4.ping_group_range")
+    return {"argv": [sys.executable, tool("Network", "icmp-rangescan"), "-r", "127.0.0.0/22",
+                     "-e", "socket", "-o", ctx.path("live-socket.txt")],
+            "before": lambda: _remove(ctx.path("live-socket.txt")),
+            "work": 1022}
+
+
+@benchmark("icmp-ping", "hosts")
+def bench_icmp_ping(ctx):
+    if shutil.which("ping") is None:
+        raise Skip("no ping binary on PATH")
+    return {"argv": [sys.executable, tool("Network", "icmp-rangescan"), "-r", "127.0.0.0/26",
+                     "-o", ctx.path("live-ping.txt")],
+            "before": lambda: _remove(ctx.path("live-ping.txt")),
+            "work": 62}
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+@benchmark("console-list-cold")
+def bench_console_list_cold(ctx):
+    manifest = os.path.join(ctx.env["CSAK_HOME"], "manifest.json")
+    return {"argv": [sys.executable, os.path.join(ROOT, "console.py"), "list"],
+            "before": lambda: _remove(manifest)}
+
+
+@benchmark("console-list")
+def bench_console_list(ctx):
+    argv = [sys.executable, os.path.join(ROOT, "console.py"), "list"]
+    return {"argv": argv, "prime": argv}
+
+
+@benchmark("console-shell")
+def bench_console_shell(ctx):
+    if find_spec("cmd2") is None:
+        raise Skip("cmd2 is not installed")
+    script = ctx.path("console-commands.txt")
+    with open(script, "w") as f:
+        f.write("list\nquit\n")
+    argv = [sys.executable, os.path.join(ROOT, "console.py")]
+    return {"argv": argv, "prime": argv, "stdin": script}
+
+
+# ---------------------------------------------------------------------------
+# reporting
+# ---------------------------------------------------------------------------
+
+def compare(results, baseline, threshold):
+    """Return {case: {metric: change}} and the list of (case, metric, change) regressions"""
+    deltas, regressions = {}, []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if result.get("status") != "ok" or not base or base.get("status") != "ok":
+            continue
+        deltas[name] = {}
+        for metric, floor in COMPARED.items():
+            new, old = result.get(metric), base.get(metric)
+            if new is None or not old:
+                continue
+            change = new / old - 1
+            deltas[name][metric] = change
+            if change > threshold and new - old > floor:
+                regressions.append((name, metric, change))
+    return deltas, regressions
+
+
+def _fmt(value, suffix, digits=3):
+    return "-" if value is None else f"{value:.{digits}f}{suffix}"
+
+
+def print_report(results, deltas, regressions):
+    flagged = {(name, metric) for name, metric, _ in regressions}
+    print(f"{'benchmark':<20} {'wall':>9} {'cpu':>9} {'peak rss':>10} {'throughput':>16}  vs baseline")
+    for name, r in results.items():
+        if r["status"] != "ok":
+            print(f"{name:<20} {r['status']}: {r.get('reason') or r.get('stderr', '').strip().splitlines()[-1:]}")
+            continue
+        rate = f"{r['throughput']:.1f} {r['unit']}/s" if r.get("throughput") else f"{r['wall_s'] * 1000:.0f} ms"
+        changes = "  ".join(
+            f"{metric.split('_')[0]} {change:+.0%}{' !' if (name, metric) in flagged else ''}"
+            for metric, change in deltas.get(name, {}).items()
+        )
+        print(f"{name:<20} {_fmt(r['wall_s'], 's'):>9} {_fmt(r['cpu_s'], 's'):>9} "
+              f"{_fmt(r['maxrss_mb'], 'MB', 1):>10} {rate:>16}  {changes}")
+    for name, metric, change in regressions:
+        print(f"REGRESSION: {name} {metric} {change:+.1%}")
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Benchmark the CSAK tools and console.")
+    parser.add_argument("--only", nargs="+", default=["*"], help="Benchmark names or glob patterns to run")
+    parser.add_argument("--list", action="store_true", help="List the benchmarks and exit")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark; the median is reported (default: 3)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every generated workload size (default: 1.0)")
+    parser.add_argument("--output", default=RESULTS_PATH, help=f"Where to write the results JSON (default: {os.path.relpath(RESULTS_PATH, ROOT)})")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help=f"Baseline to compare against (default: {os.path.relpath(BASELINE_PATH, ROOT)})")
+    parser.add_argument("--save-baseline", action="store_true", help="Write these results to the baseline file")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help=f"Relative slowdown/growth flagged as a regression (default: {THRESHOLD})")
+    parser.add_argument("--workdir", help="Directory for generated inputs (default: a temporary directory)")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated inputs")
+    args = parser.parse_args(argv)
+
+    selected = [(n, u, f) for n, u, f in CASES if any(fnmatch.fnmatch(n, p) for p in args.only)]
+    if args.list:
+        for name, unit, fn in selected:
+            print(f"{name:<20} {fn.__name__}")
+        return 0
+    if not selected:
+        print("No benchmark matches", " ".join(args.only), file=sys.stderr)
+        return 2
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="csak-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    ctx = Context(workdir, args.scale)
+    results = {}
+    try:
+        for name, unit, fn in selected:
+            print(f"running {name} ...", file=sys.stderr, flush=True)
+            results[name] = run_case(name, unit, fn, ctx, max(1, args.repeat))
+    finally:
+        ctx.close()
+        if not args.keep and not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    doc = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "scale": args.scale,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+    baseline = {}
+    try:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            base_doc = json.load(f)
+        if base_doc.get("meta", {}).get("scale") == args.scale:
+            baseline = base_doc.get("results", {})
+        else:
+            print("Baseline was recorded at another --scale; not comparing", file=sys.stderr)
+    except FileNotFoundError:
+        if not args.save_baseline:
+            print(f"No baseline at {args.baseline}; run with --save-baseline to record one", file=sys.stderr)
+    except (OSError, ValueError) as e:
+        print(f"Could not read baseline {args.baseline}: {e}", file=sys.stderr)
+
+    deltas, regressions = compare(results, baseline, args.threshold)
+    print_report(results, deltas, regressions)
+
+    for path in [args.output] + ([args.baseline] if args.save_baseline else []):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(doc, f, indent=1)
+            f.write("\n")
+        print(f"Results written to {path}", file=sys.stderr)
+
+    failed = [n for n, r in results.items() if r["status"] == "failed"]
+    return 1 if failed or regressions else 0
@@ -0,0 +1,10 @@
+"""Support code for the CSAK console (tool registry, execution and state)."""
+
+import os
+
+# directory holding console state (manifest, history, logs); relative to the
+# working directory like SCRIPTS_DIR unless overridden
+CSAK_HOME = os.environ.get("CSAK_HOME", ".csak")
+
+# define scripts directory
+SCRIPTS_DIR = "./modules"
@@ -0,0 +1,117 @@
+"""Per-run resource accounting and profiling for the console.
+
+Each finished tool run is appended to ``.csak/history.jsonl`` with its wall
+time, CPU time, peak RSS and exit code, as reported by the engine handle's
+``usage``. ``summarise`` folds the history into per-tool statistics for the
+``stats`` command. Runs made with ``profile on`` leave a cProfile dump under
+``.csak/profiles`` that ``hotspots`` renders as a short table.
+"""
+
+import io
+import json
+import os
+import statistics
+import threading
+import time
+
+from csak import CSAK_HOME
+
+HISTORY_PATH = os.path.join(CSAK_HOME, "history.jsonl")
+PROFILES_DIR = os.path.join(CSAK_HOME, "profiles")
+
+
+class History:
+    """Append-only JSON-lines log of tool runs"""
+
+    def __init__(self, path=HISTORY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, tool, argv, engine, returncode, wall, usage=None, mode="fg", profile=None):
+        """Append one run and return the stored entry"""
+        usage = usage or {}
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "tool": tool,
+            "argv": list(argv),
+            "engine": engine,
+            "mode": mode,
+            "returncode": returncode,
+            "wall_s": round(wall, 4),
+            "cpu_s": usage.get("cpu_s"),
+            "maxrss_mb": usage.get("maxrss_mb"),
+            "profile": profile,
+        }
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        return entry
+
+    def load(self, tool=None):
+        """Return recorded runs, oldest first, optionally for one tool"""
+        runs = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # a torn line from an interrupted write
+                    if tool is None or entry.get("tool") == tool:
+                        runs.append(entry)
+        except FileNotFoundError:
+            pass
+        return runs
+
+    def clear(self):
+        with self._lock:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+
+def summarise(runs):
+    """Per-tool statistics, one dict per tool sorted by total wall time"""
+    by_tool = {}
+    for run in runs:
+        by_tool.setdefault(run["tool"], []).append(run)
+    rows = []
+    for tool, tool_runs in by_tool.items():
+        walls = [r["wall_s"] for r in tool_runs]
+        cpus = [r["cpu_s"] for r in tool_runs if r.get("cpu_s") is not None]
+        rss = [r["maxrss_mb"] for r in tool_runs if r.get("maxrss_mb") is not None]
+        rows.append({
+            "tool": tool,
+            "runs": len(tool_runs),
+            "failed": sum(1 for r in tool_runs if r.get("returncode") != 0),
+            "total_s": sum(walls),
+            "mean_s": statistics.fmean(walls),
+            "median_s": statistics.median(walls),
+            "max_s": max(walls),
+            "cpu_s": statistics.fmean(cpus) if cpus else None,
+            "maxrss_mb": max(rss) if rss else None,
+            "last": tool_runs[-1]["ts"],
+        })
+    rows.sort(key=lambda r: r["total_s"], reverse=True)
+    return rows
+
+
+def profile_path(tool, profiles_dir=PROFILES_DIR):
+    """Return a fresh path for a tool's profile dump, creating the directory"""
+    os.makedirs(profiles_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(profiles_dir, f"{stamp}-{tool.replace('/', '_')}.prof")
+
+
+def hotspots(path, limit=15, sort="tottime"):
+    """Render the top functions of a cProfile dump as text"""
+    import pstats
+    out = io.StringIO()
+    stats = pstats.Stats(path, stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    # drop pstats' preamble (file name and blank lines) before the totals
+    lines = out.getvalue().splitlines()
+    start = next((i for i, line in enumerate(lines) if "function calls" in line), 0)
+    return "\n".join(lines[start:]).rstrip()
@@ -0,0 +1,154 @@
+"""Bounded capture of a foreground tool's output.
+
+Instead of writing straight to the terminal, the tool's stdout and stderr go
+to a pipe that a reader thread drains as fast as the tool writes. Every byte
+is spooled to ``.csak/runs/last.log`` and the most recent lines are kept in a
+ring buffer, so a tool printing millions of lines is never throttled by the
+terminal and the console's memory stays bounded. The console shows a live
+status line while the tool runs, the tail of its output when it ends, and
+the ``output`` command pages or greps the full log afterwards.
+"""
+
+import codecs
+import os
+import re
+import threading
+import time
+from collections import deque
+
+from csak import CSAK_HOME
+
+RUNS_DIR = os.path.join(CSAK_HOME, "runs")
+LAST_LOG = os.path.join(RUNS_DIR, "last.log")
+MAX_LINES = 10000        # lines kept in memory for 'output'
+READ_SIZE = 1 << 16
+LINE_LIMIT = 1 << 16     # characters of one line kept in memory; the spool has it all
+SPOOL_BUFFER = 1 << 20
+
+# colour codes and other terminal escapes, dropped from the status line
+_ANSI = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+
+
+class OutputCapture:
+    """Drain a pipe on a thread into a ring buffer of lines and a spool file"""
+
+    def __init__(self, fd, log_path=LAST_LOG, max_lines=MAX_LINES):
+        self.fd = fd
+        self.log_path = log_path
+        self.lines = deque(maxlen=max_lines)
+        self.line_count = 0
+        self.bytes = 0
+        self._pieces = []          # start of the line being written, up to LINE_LIMIT
+        self._partial_len = 0      # its full length so far
+        self._recent = ""          # its most recently received text, for the status line
+        self.started = time.monotonic()
+        self.error = None
+        os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+        self._spool = open(log_path, "wb", buffering=SPOOL_BUFFER)
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+
+    def _read(self):
+        try:
+            while True:
+                chunk = os.read(self.fd, READ_SIZE)
+                if not chunk:
+                    break
+                self._spool.write(chunk)
+                self.bytes += len(chunk)
+                self._add(self._decoder.decode(chunk))
+            self._add(self._decoder.decode(b"", final=True))
+            if self._partial_len:
+                self.lines.append(self._take(""))
+                self.line_count += 1
+        except OSError as e:
+            self.error = e
+        finally:
+            os.close(self.fd)
+            self._spool.close()
+
+    def _add(self, text):
+        if not text:
+            return
+        # only the new text is searched for newlines, so a long line costs
+        # time proportional to its length rather than its square
+        parts = text.split("\n")
+        tail = parts.pop()
+        if parts:
+            parts[0] = self._take(parts[0])
+            # the deque's maxlen discards older lines in C, so huge bursts stay cheap
+            self.lines.extend(parts)
+            self.line_count += len(parts)
+        self._grow(tail)
+
+    def _grow(self, text):
+        """Append text to the unfinished line, keeping at most LINE_LIMIT characters"""
+        if not text:
+            return
+        room = LINE_LIMIT - self._partial_len
+        if room > 0:
+            self._pieces.append(text[:room])
+        self._partial_len += len(text)
+        self._recent = text
+
+    def _take(self, end):
+        """Finish the unfinished line with end and return it (shortened if over the limit)"""
+        if not self._partial_len:
+            return end if len(end) <= LINE_LIMIT else end[:LINE_LIMIT] + " ..."
+        length = self._partial_len + len(end)
+        self._grow(end)
+        line = "".join(self._pieces)
+        self._pieces = []
+        self._partial_len = 0
+        self._recent = ""
+        return line if length <= LINE_LIMIT else line + " ..."
+
+    def join(self, timeout=None):
+        """Wait for the writer side to close (the tool and anything it started)"""
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    @property
+    def done(self):
+        return not self._thread.is_alive()
+
+    def last_line(self):
+        """The line being written, else the last complete one, without escapes"""
+        text = self._recent or (self.lines[-1] if self.lines else "")
+        return _ANSI.sub("", text[-1024:]).strip()
+
+    def status(self, width=80):
+        """One-line progress summary sized to the terminal"""
+        elapsed = time.monotonic() - self.started
+        head = f"[{elapsed:6.1f}s] {self.line_count:,} lines, {format_size(self.bytes)}"
+        last = self.last_line()
+        room = width - len(head) - 3
+        if last and room > 10:
+            head += " | " + (last if len(last) <= room else last[:room - 3] + "...")
+        return head[:width]
+
+    def tail(self, n):
+        """The last n captured lines (fewer if the buffer holds fewer)"""
+        n = min(n, len(self.lines))
+        return list(self.lines)[-n:] if n > 0 else []
+
+
+def format_size(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f}{unit}" if unit == "B" else f"{n:.1f}{unit}"
+        n /= 1024
+
+
+def grep_log(path, pattern, limit=200):
+    """Yield (line number, line) for lines of a spooled log matching a regex"""
+    regex = re.compile(pattern)
+    found = 0
+    with open(path, "r", encoding="utf-8", errors="replace", newline=None) as f:
+        for number, line in enumerate(f, 1):
+            if regex.search(line):
+                yield number, line.rstrip("\n")
+                found += 1
+                if found >= limit:
+                    return
@@ -0,0 +1,120 @@
+"""Non-interactive CSAK entry point for cron jobs and other tooling.
+
+    console.py list [--json]
+    console.py show <module>/<tool> [--json]
+    console.py run [--json] <module>/<tool> [tool arguments ...]
+
+Only the standard library and the tool registry are imported here; cmd2 and
+colorama are left to the interactive shell. Every ``--json`` document carries
+``startup_ms``, the time from console.py starting to the command being
+dispatched, so the cost of the non-interactive path can be tracked.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+from csak import SCRIPTS_DIR
+from csak.registry import ToolRegistry
+
+
+def _parser():
+    parser = argparse.ArgumentParser(
+        prog="console.py",
+        description="CSAK non-interactive interface. Run without arguments for the interactive console.",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("list", help="List modules and tools")
+    p.add_argument("--json", action="store_true", help="Emit JSON")
+
+    p = sub.add_parser("show", help="Show a tool's options")
+    p.add_argument("tool", help="Tool as <module>/<tool>")
+    p.add_argument("--json", action="store_true", help="Emit JSON")
+
+    p = sub.add_parser("run", help="Run a tool, passing the remaining arguments through")
+    p.add_argument("--json", action="store_true", help="Capture output and emit a JSON result")
+    p.add_argument("tool", help="Tool as <module>/<tool>")
+    p.add_argument("args", nargs=argparse.REMAINDER, help="Arguments for the tool")
+    return parser
+
+
+def _emit(doc, started):
+    doc["startup_ms"] = round(started * 1000, 3)
+    json.dump(doc, sys.stdout, indent=1)
+    sys.stdout.write("\n")
+
+
+def _lookup(registry, name):
+    module, _, tool = name.partition("/")
+    entry = registry.lookup(module, tool)
+    if entry is None:
+        print(f"No such tool {name}", file=sys.stderr)
+    return entry
+
+
+def cmd_list(args, registry, started):
+    try:
+        registry.refresh()
+    except FileNotFoundError:
+        print(f"Scripts directory not found: {SCRIPTS_DIR}", file=sys.stderr)
+        return 1
+    if args.json:
+        _emit({
+            "modules": {m: info["description"] for m, info in registry.modules.items()},
+            "tools": [
+                {"index": i, "tool": f"{m}/{t}", "description": registry.get(m, t)["description"]}
+                for i, (m, t) in enumerate(registry.index)
+            ],
+        }, started)
+        return 0
+    for i, (m, t) in enumerate(registry.index):
+        print(f"{i}\t{m}/{t}\t{registry.get(m, t)['description']}")
+    return 0
+
+
+def cmd_show(args, registry, started):
+    entry = _lookup(registry, args.tool)
+    if entry is None:
+        return 1
+    if args.json:
+        _emit({"tool": args.tool, "description": entry["description"], "options": entry["options"]}, started)
+        return 0
+    for opt in entry["options"]:
+        flags = ", ".join(opt["flags"])
+        required = "required" if opt["required"] else "optional"
+        print(f"{opt['option']}\t{flags}\t{required}\t{opt['default']}\t{opt['help']}")
+    return 0
+
+
+def cmd_run(args, registry, started):
+    entry = _lookup(registry, args.tool)
+    if entry is None:
+        return 1
+    cmd = [sys.executable, entry["path"], *args.args]
+    if not args.json:
+        return subprocess.run(cmd).returncode
+    began = time.perf_counter()
+    result = subprocess.run(cmd, capture_output=True, text=True, errors="replace")
+    _emit({
+        "tool": args.tool,
+        "argv": args.args,
+        "returncode": result.returncode,
+        "wall_time": round(time.perf_counter() - began, 6),
+        "stdout": result.stdout,
+        "stderr": result.stderr,
+    }, started)
+    return result.returncode
+
+
+COMMANDS = {"list": cmd_list, "show": cmd_show, "run": cmd_run}
+
+
+def main(argv, t0):
+    """Dispatch a non-interactive command; t0 is perf_counter() at console.py start"""
+    args = _parser().parse_args(argv)
+    registry = ToolRegistry(SCRIPTS_DIR)
+    started = time.perf_counter() - t0
+    return COMMANDS[args.command](args, registry, started)
@@ -0,0 +1,386 @@
+"""Execution engines used by the console to launch tool scripts.
+
+``SubprocessEngine`` starts a fresh interpreter per run (the original
+behaviour). ``WarmEngine`` keeps a fork-server alive with the tools' imports
+(requests, ...) already loaded; each run is forked from it and executed
+with ``runpy`` so crashes and ``sys.exit`` stay isolated in the child.
+
+Both engines return a Popen-like handle exposing ``pid``, ``returncode``,
+``poll()``, ``wait()``, ``terminate()`` and ``kill()``, plus ``usage``: once
+the run has finished, a dict with its CPU time and peak RSS (including any
+processes the tool itself waited for), or None where that is unavailable.
+Passing ``profile=<path>`` to ``start`` runs the tool under cProfile and
+writes the stats to that path.
+"""
+
+import importlib
+import json
+import os
+import select
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import traceback
+
+ENGINES = ("subprocess", "warm")
+
+# root of the CSAK checkout, so the fork-server can import this package
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _fileno(stream, default):
+    """Map a Popen-style stdio argument to a raw file descriptor"""
+    if stream is None:
+        return default
+    if isinstance(stream, int):
+        return stream
+    return stream.fileno()
+
+
+def _usage(cpu, maxrss):
+    """Normalise rusage figures; ru_maxrss is KiB on Linux but bytes on macOS"""
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {"cpu_s": round(cpu, 4), "maxrss_mb": round(maxrss / scale, 1)}
+
+
+class SubprocessProcess:
+    """Handle for a tool started by the subprocess engine.
+
+    The child is reaped with ``os.wait4`` instead of Popen's own waitpid so
+    its resource usage is kept. Platforms without wait4 fall back to Popen.
+    Linux charges the parent's RSS at exec time to the child's ru_maxrss, so
+    for tools smaller than the console the peak is an upper bound.
+    """
+
+    def __init__(self, popen):
+        self.popen = popen
+        self.pid = popen.pid
+        self.args = popen.args
+        self.returncode = None
+        self.usage = None
+
+    def _reap(self, flags):
+        if not hasattr(os, "wait4"):
+            self.returncode = self.popen.wait() if flags == 0 else self.popen.poll()
+            return
+        try:
+            pid, status, rusage = os.wait4(self.pid, flags)
+        except ChildProcessError:
+            self.returncode = self.popen.poll()
+            return
+        if pid:
+            self.returncode = self.popen.returncode = os.waitstatus_to_exitcode(status)
+            self.usage = _usage(rusage.ru_utime + rusage.ru_stime, rusage.ru_maxrss)
+
+    def poll(self):
+        if self.returncode is None:
+            self._reap(os.WNOHANG if hasattr(os, "WNOHANG") else 1)
+        return self.returncode
+
+    def wait(self, timeout=None):
+        if timeout is None:
+            while self.returncode is None:
+                self._reap(0)
+            return self.returncode
+        deadline = time.monotonic() + timeout
+        while self.poll() is None:
+            if time.monotonic() >= deadline:
+                raise subprocess.TimeoutExpired(self.args, timeout)
+            time.sleep(0.01)
+        return self.returncode
+
+    def send_signal(self, sig):
+        # not Popen.send_signal: it polls first, which would reap the child
+        # and lose its resource usage
+        if self.returncode is None:
+            try:
+                os.kill(self.pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(getattr(signal, "SIGKILL", signal.SIGTERM))
+
+
+class SubprocessEngine:
+    """Run each tool in a fresh interpreter via subprocess"""
+
+    name = "subprocess"
+
+    def start(self, script, argv, stdin=None, stdout=None, stderr=None, env=None, profile=None):
+        cmd = [sys.executable, script, *argv]
+        if profile:
+            cmd[1:1] = ["-m", "cProfile", "-o", profile]
+        return SubprocessProcess(
+            subprocess.Popen(cmd, stdin=stdin, stdout=stdout, stderr=stderr, env=env)
+        )
+
+    def close(self):
+        pass
+
+
+class WarmProcess:
+    """Handle for a tool forked by the warm engine's server"""
+
+    def __init__(self, pid, status_fd, args):
+        self.pid = pid
+        self.args = args
+        self.returncode = None
+        self.usage = None
+        self._status_fd = status_fd
+        self._signal = None
+
+    def _collect(self):
+        """Read the exit report written by the child (EOF means it died)"""
+        chunks = []
+        while True:
+            chunk = os.read(self._status_fd, 4096)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        os.close(self._status_fd)
+        try:
+            report = json.loads(b"".join(chunks))
+            self.returncode = report["returncode"]
+            self.usage = report.get("usage")
+        except (ValueError, KeyError):
+            self.returncode = -(self._signal or signal.SIGKILL)
+        return self.returncode
+
+    def poll(self):
+        if self.returncode is None:
+            ready, _, _ = select.select([self._status_fd], [], [], 0)
+            if ready:
+                self._collect()
+        return self.returncode
+
+    def wait(self, timeout=None):
+        if self.returncode is None:
+            ready, _, _ = select.select([self._status_fd], [], [], timeout)
+            if not ready:
+                raise subprocess.TimeoutExpired(self.args, timeout)
+            self._collect()
+        return self.returncode
+
+    def send_signal(self, sig):
+        if self.poll() is None:
+            self._signal = sig
+            try:
+                os.kill(self.pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+
+class WarmEngine:
+    """Run tools inside children forked from a pre-warmed server process"""
+
+    name = "warm"
+
+    def __init__(self, preload=()):
+        if not hasattr(os, "fork"):
+            raise OSError("the warm engine requires a platform with fork()")
+        self.preload = list(preload)
+        self._server = None
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _ensure_server(self):
+        if self._server is not None and self._server.poll() is None:
+            return
+        from multiprocessing.connection import Connection
+
+        ours, theirs = socket.socketpair()
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [_ROOT, env.get("PYTHONPATH")]))
+        self._server = subprocess.Popen(
+            [sys.executable, "-m", "csak.engine", str(theirs.fileno()), *self.preload],
+            pass_fds=(theirs.fileno(),),
+            stdin=subprocess.DEVNULL,
+            env=env,
+        )
+        theirs.close()
+        self._conn = Connection(ours.detach())
+
+    def start(self, script, argv, stdin=None, stdout=None, stderr=None, env=None, profile=None):
+        from multiprocessing.reduction import send_handle
+
+        out_fd = _fileno(stdout, 1)
+        err_fd = out_fd if stderr == subprocess.STDOUT else _fileno(stderr, 2)
+        fds = [_fileno(stdin, 0), out_fd, err_fd]
+        request = {
+            "script": script,
+            "argv": list(argv),
+            "cwd": os.getcwd(),
+            "env": dict(os.environ if env is None else env),
+            "profile": profile,
+        }
+        status_r, status_w = os.pipe()
+        try:
+            with self._lock:
+                self._ensure_server()
+                self._conn.send(request)
+                for fd in fds + [status_w]:
+                    send_handle(self._conn, fd, self._server.pid)
+                pid = self._conn.recv()
+        except (OSError, EOFError):
+            os.close(status_r)
+            raise
+        finally:
+            os.close(status_w)
+        return WarmProcess(pid, status_r, [script, *argv])
+
+    def close(self):
+        """Stop the fork-server; running children are left to finish"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self._server is not None:
+            try:
+                self._server.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._server.kill()
+            self._server = None
+
+
+def get_engine(name, preload=()):
+    """Create an engine by name ('subprocess' or 'warm')"""
+    if name == "warm":
+        return WarmEngine(preload)
+    if name == "subprocess":
+        return SubprocessEngine()
+    raise ValueError(f"Unknown engine: {name} (choose from {', '.join(ENGINES)})")
+
+
+# ---------------------------------------------------------------------------
+# fork-server side
+# ---------------------------------------------------------------------------
+
+def _exit_code(exc):
+    """Translate a SystemExit into the status an interpreter would exit with"""
+    code = exc.code
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+def _run_child(request, stdin, stdout, stderr, status):
+    """Executed in the forked child: run one tool and report its exit status"""
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    os.set_inheritable(status, False)
+    for src, dst in ((stdin, 0), (stdout, 1), (stderr, 2)):
+        os.dup2(src, dst)
+    for fd in {stdin, stdout, stderr} - {0, 1, 2}:
+        os.close(fd)
+    # fresh std streams so buffering matches a newly started interpreter
+    sys.stdin = open(0, "r", closefd=False)
+    sys.stdout = open(1, "w", buffering=1 if os.isatty(1) else -1, closefd=False)
+    sys.stderr = open(2, "w", buffering=1, closefd=False)
+
+    os.chdir(request["cwd"])
+    os.environ.clear()
+    os.environ.update(request["env"])
+    script = request["script"]
+    sys.argv = [script, *request["argv"]]
+    sys.path[0] = os.path.dirname(os.path.abspath(script))
+
+    import resource
+    import runpy
+    profiler = None
+    if request.get("profile"):
+        import cProfile
+        profiler = cProfile.Profile()
+    try:
+        if profiler:
+            profiler.runcall(runpy.run_path, script, run_name="__main__")
+        else:
+            runpy.run_path(script, run_name="__main__")
+        code = 0
+    except SystemExit as e:
+        code = _exit_code(e)
+    except KeyboardInterrupt:
+        code = -signal.SIGINT
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    if profiler:
+        try:
+            profiler.dump_stats(request["profile"])
+        except OSError as e:
+            print(f"Could not write profile: {e}", file=sys.stderr)
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.flush()
+        except (OSError, ValueError):
+            pass
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    usage = _usage(own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime,
+                   max(own.ru_maxrss, children.ru_maxrss))
+    try:
+        os.write(status, json.dumps({"returncode": code, "usage": usage}).encode())
+    finally:
+        os._exit(0)
+
+
+def _reap():
+    """Collect exited children so they do not linger as zombies"""
+    while True:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+
+
+def serve(fd, preload):
+    """Fork-server main loop: preload modules, then fork one child per request"""
+    from multiprocessing.connection import Connection
+    from multiprocessing.reduction import recv_handle
+
+    # Ctrl-C in the console is meant for the running tool, not the server
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for name in preload:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass  # tools report their own import errors when run
+
+    conn = Connection(fd)
+    while True:
+        _reap()
+        try:
+            if not conn.poll(1.0):
+                continue
+            request = conn.recv()
+            fds = [recv_handle(conn) for _ in range(4)]
+        except (EOFError, OSError):
+            break
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            conn.close()
+            _run_child(request, *fds)
+        for f in fds:
+            os.close(f)
+        conn.send(pid)
+
+
+if __name__ == "__main__":
+    serve(int(sys.argv[1]), sys.argv[2:])
@@ -0,0 +1,155 @@
+"""Background job manager: queued tool runs with a concurrency limit.
+
+Each job runs through the console's execution engine with stdin detached and
+stdout/stderr captured to its own log file. A scheduler thread starts queued
+jobs whenever a slot frees up, so batch runs fan out over at most
+``concurrency`` processes at a time.
+"""
+
+import os
+import threading
+import time
+from subprocess import STDOUT
+
+from csak import CSAK_HOME
+
+JOBS_DIR = os.path.join(CSAK_HOME, "jobs")
+
+
+class Job:
+    """A single tool run tracked by the job manager"""
+
+    def __init__(self, job_id, tool, script, argv, log_path):
+        self.id = job_id
+        self.tool = tool
+        self.script = script
+        self.argv = argv
+        self.log_path = log_path
+        self.state = "queued"     # queued -> running -> done | failed | killed
+        self.returncode = None
+        self.usage = None         # cpu/maxrss reported by the engine once finished
+        self.proc = None
+        self.error = None
+        self.started = None
+        self.finished = None
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    @property
+    def active(self):
+        return self.state in ("queued", "running")
+
+
+class JobManager:
+    """Schedules background jobs over an engine with bounded concurrency"""
+
+    def __init__(self, engine_factory, concurrency=None, jobs_dir=JOBS_DIR, on_finish=None):
+        self.engine_factory = engine_factory   # callable returning the engine
+        self.concurrency = concurrency or os.cpu_count() or 1
+        self.jobs_dir = jobs_dir
+        self.on_finish = on_finish             # called with each job as it ends
+        self.jobs = {}
+        self._next_id = 1
+        self._finished = []
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def submit(self, tool, script, argv):
+        """Queue a tool run and return its Job"""
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        with self._cond:
+            job_id = self._next_id
+            self._next_id += 1
+            log_path = os.path.join(self.jobs_dir, f"{job_id}-{tool.replace('/', '_')}.log")
+            job = Job(job_id, tool, script, argv, log_path)
+            self.jobs[job_id] = job
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._schedule, daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+        return job
+
+    def _start(self, job):
+        """Launch a queued job with its output captured to the log file"""
+        job.started = time.time()
+        try:
+            with open(job.log_path, "wb") as log, open(os.devnull, "rb") as devnull:
+                job.proc = self.engine_factory().start(
+                    job.script, job.argv, stdin=devnull, stdout=log, stderr=STDOUT
+                )
+            job.state = "running"
+        except Exception as e:
+            job.error = str(e)
+            job.state = "failed"
+            job.finished = time.time()
+            self._finish(job)
+
+    def _finish(self, job):
+        self._finished.append(job)
+        self._record(job)
+
+    def _record(self, job):
+        """Collect the job's resource usage and hand it to the on_finish callback"""
+        job.usage = getattr(job.proc, "usage", None)
+        if self.on_finish is not None:
+            try:
+                self.on_finish(job)
+            except Exception:
+                pass  # bookkeeping must not stop the scheduler
+
+    def _schedule(self):
+        while True:
+            with self._cond:
+                for job in self.jobs.values():
+                    if job.state == "running" and job.proc.poll() is not None:
+                        job.returncode = job.proc.returncode
+                        job.finished = time.time()
+                        job.state = "done" if job.returncode == 0 else "failed"
+                        self._finish(job)
+                running = sum(1 for j in self.jobs.values() if j.state == "running")
+                for job in self.jobs.values():
+                    if running >= self.concurrency:
+                        break
+                    if job.state == "queued":
+                        self._start(job)
+                        running += job.state == "running"
+                self._cond.notify_all()
+                self._cond.wait(0.2)
+
+    def kill(self, job_id):
+        """Kill a running job or drop a queued one; returns False if not active"""
+        with self._cond:
+            job = self.jobs.get(job_id)
+            if job is None or not job.active:
+                return False
+            if job.state == "running":
+                job.proc.kill()
+                job.proc.wait()
+                job.returncode = job.proc.returncode
+            job.state = "killed"
+            job.finished = time.time()
+            if job.proc is not None:
+                self._record(job)
+            self._cond.notify_all()
+            return True
+
+    def kill_all(self):
+        """Kill every active job, returning how many were stopped"""
+        return sum(self.kill(job_id) for job_id in list(self.jobs))
+
+    def wait(self, job_ids=None):
+        """Block until the given jobs (default: all) have finished"""
+        with self._cond:
+            ids = list(self.jobs) if job_ids is None else job_ids
+            while any(self.jobs[i].active for i in ids if i in self.jobs):
+                self._cond.wait(0.5)
+
+    def pop_finished(self):
+        """Return jobs that finished since the last call"""
+        with self._cond:
+            finished, self._finished = self._finished, []
+        return finished
@@ -0,0 +1,268 @@
+"""Tool registry: scans the modules directory once and caches tool metadata.
+
+Every tool script is parsed with ``ast`` to pull out its description and the
+real argparse options (flags, defaults, required, flag-style actions). Results
+are kept in memory and persisted to an on-disk manifest so later sessions only
+re-parse scripts whose mtime or size changed.
+"""
+
+import json
+import os
+import shlex
+
+from csak import CSAK_HOME
+
+MANIFEST_VERSION = 2
+MANIFEST_PATH = os.path.join(CSAK_HOME, "manifest.json")
+NO_DESCRIPTION = "No description available"
+
+# argparse actions that take no value on the command line
+FLAG_ACTIONS = {"store_true", "store_false", "store_const", "count", "help", "version"}
+
+
+def _stat_key(path):
+    """Return the (mtime_ns, size) pair used to invalidate cached entries"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _literal(node):
+    """Evaluate a constant AST node, or None if it is not a literal"""
+    import ast
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError):
+        return None
+
+
+def parse_tool(path):
+    """Parse a tool script and return its description and argparse options"""
+    # imported here: ast is only needed when a script changed, and keeping it
+    # out of module import shortens non-interactive startup
+    import ast
+    entry = {"description": NO_DESCRIPTION, "options": [], "imports": []}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            source = f.read()
+        tree = ast.parse(source, filename=path)
+    except (OSError, SyntaxError, ValueError) as e:
+        entry["error"] = str(e)
+        return entry
+
+    doc = ast.get_docstring(tree)
+    description = doc.strip().splitlines()[0] if doc and doc.strip() else None
+
+    imports = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.update(alias.name.split(".")[0] for alias in node.names)
+            continue
+        if isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            imports.add(node.module.split(".")[0])
+            continue
+        if not isinstance(node, ast.Call):
+            continue
+        func = node.func
+        name = func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", None)
+        if name == "ArgumentParser" and description is None:
+            for kw in node.keywords:
+                if kw.arg == "description" and isinstance(_literal(kw.value), str):
+                    description = _literal(kw.value)
+        elif name == "add_argument":
+            option = _parse_add_argument(node, source)
+            if option:
+                entry["options"].append(option)
+
+    # ast.walk is breadth-first; keep options in source order
+    entry["options"].sort(key=lambda o: o.pop("_line"))
+    entry["imports"] = sorted(imports)
+    if description:
+        entry["description"] = description
+    return entry
+
+
+def _parse_add_argument(node, source):
+    """Turn a parser.add_argument(...) call into an option dict"""
+    import ast
+    flags = [_literal(a) for a in node.args]
+    flags = [f for f in flags if isinstance(f, str)]
+    if not flags:
+        return None
+    kwargs = {kw.arg: kw.value for kw in node.keywords if kw.arg}
+    positional = not flags[0].startswith("-")
+    action = _literal(kwargs["action"]) if "action" in kwargs else None
+    nargs = _literal(kwargs["nargs"]) if "nargs" in kwargs else None
+
+    if positional:
+        required = nargs not in ("?", "*")
+    else:
+        required = _literal(kwargs["required"]) is True if "required" in kwargs else False
+
+    default = ""
+    if "default" in kwargs:
+        default = ast.get_source_segment(source, kwargs["default"]) or ast.unparse(kwargs["default"])
+
+    help_text = _literal(kwargs["help"]) if "help" in kwargs else None
+    return {
+        "option": flags[-1].lstrip("-"),
+        "flags": flags,
+        "positional": positional,
+        "flag": action in FLAG_ACTIONS,
+        "nargs": nargs,
+        "required": required,
+        "default": default,
+        "help": help_text if isinstance(help_text, str) else "",
+        "_line": node.lineno,
+    }
+
+
+def read_module_description(mod_path):
+    """Read first non-empty line from module's README.md or description.txt"""
+    for filename in ["README.md", "description.txt"]:
+        path = os.path.join(mod_path, filename)
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                for line in f:
+                    if line.strip():
+                        return line.strip()
+    return NO_DESCRIPTION
+
+
+class ToolRegistry:
+    """In-memory index of modules and tools backed by a JSON manifest"""
+
+    def __init__(self, scripts_dir, manifest_path=MANIFEST_PATH):
+        self.scripts_dir = scripts_dir
+        self.manifest_path = manifest_path
+        self.modules = {}   # module -> {'description', 'stat'}
+        self.tools = {}     # 'module/tool' -> {'module', 'tool', 'path', 'stat', 'description', 'options'}
+        self.index = []     # (module, tool) list in display order
+        self._dirty = False
+        self._load_manifest()
+
+    def _load_manifest(self):
+        """Seed the registry from the manifest written by a previous session"""
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != MANIFEST_VERSION:
+            return
+        if data.get("scripts_dir") != os.path.abspath(self.scripts_dir):
+            return
+        self.modules = data.get("modules", {})
+        self.tools = data.get("tools", {})
+
+    def save(self):
+        """Persist the registry to the manifest if anything changed"""
+        if not self._dirty:
+            return
+        data = {
+            "version": MANIFEST_VERSION,
+            "scripts_dir": os.path.abspath(self.scripts_dir),
+            "modules": self.modules,
+            "tools": self.tools,
+        }
+        try:
+            os.makedirs(os.path.dirname(self.manifest_path) or ".", exist_ok=True)
+            tmp = f"{self.manifest_path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=1)
+            os.replace(tmp, self.manifest_path)
+            self._dirty = False
+        except OSError:
+            pass  # the manifest is only a cache
+
+    def refresh(self):
+        """Re-validate every module and tool by stat, re-parsing only changed files"""
+        if not os.path.isdir(self.scripts_dir):
+            raise FileNotFoundError(self.scripts_dir)
+        modules, tools, index = {}, {}, []
+        for module in sorted(os.listdir(self.scripts_dir)):
+            mod_path = os.path.join(self.scripts_dir, module)
+            if module.startswith((".", "_")) or not os.path.isdir(mod_path):
+                continue
+            modules[module] = self._module_entry(module, mod_path)
+            for fname in sorted(os.listdir(mod_path)):
+                if not fname.endswith(".py") or fname.startswith("_"):
+                    continue
+                tool = fname[:-3]
+                key = f"{module}/{tool}"
+                tools[key] = self._tool_entry(key, module, tool, os.path.join(mod_path, fname))
+                index.append((module, tool))
+        if modules.keys() != self.modules.keys() or tools.keys() != self.tools.keys():
+            self._dirty = True
+        self.modules, self.tools, self.index = modules, tools, index
+        self.save()
+        return self
+
+    def _module_entry(self, module, mod_path):
+        stat = [_stat_key(os.path.join(mod_path, n)) for n in ("README.md", "description.txt")]
+        cached = self.modules.get(module)
+        if cached and cached.get("stat") == stat:
+            return cached
+        self._dirty = True
+        return {"description": read_module_description(mod_path), "stat": stat}
+
+    def _tool_entry(self, key, module, tool, path):
+        stat = _stat_key(path)
+        cached = self.tools.get(key)
+        if cached and cached.get("stat") == stat:
+            return cached
+        self._dirty = True
+        entry = parse_tool(path)
+        entry.update({"module": module, "tool": tool, "path": path, "stat": stat})
+        return entry
+
+    def get(self, module, tool):
+        """Return the cached entry for a tool, or None"""
+        return self.tools.get(f"{module}/{tool}")
+
+    def lookup(self, module, tool):
+        """Return a tool entry, re-validating only that script instead of the whole tree"""
+        if not module or not tool or any(os.sep in n or n.startswith(".") for n in (module, tool)):
+            return None
+        path = os.path.join(self.scripts_dir, module, f"{tool}.py")
+        if not os.path.isfile(path):
+            return None
+        key = f"{module}/{tool}"
+        self.tools[key] = self._tool_entry(key, module, tool, path)
+        self.save()
+        return self.tools[key]
+
+    def options(self, module, tool):
+        """Return the option dicts for a tool keyed by option name (re-validated by stat)"""
+        entry = self.lookup(module, tool)
+        return {o["option"]: o for o in entry["options"]} if entry else {}
+
+    def imports(self):
+        """Return every top-level module imported by any registered tool"""
+        names = set()
+        for entry in self.tools.values():
+            names.update(entry.get("imports", []))
+        return sorted(names)
+
+    def build_argv(self, module, tool, values):
+        """Build the command line arguments for a tool from set option values"""
+        opts = self.options(module, tool)
+        argv, positionals = [], {}
+        for k, v in values.items():
+            opt = opts.get(k)
+            if opt is None:
+                argv += [f"--{k}"] if v is None else [f"--{k}", v]
+                continue
+            multi = opt["nargs"] in ("*", "+") or isinstance(opt["nargs"], int)
+            vals = [] if v is None else (shlex.split(v) if multi else [v])
+            if opt["positional"]:
+                positionals[k] = vals
+                continue
+            flag = next((f for f in opt["flags"] if f.startswith("--")), opt["flags"][-1])
+            argv += [flag] + vals
+        # positionals go last, in the order the tool declares them
+        for k in opts:
+            argv += positionals.get(k, [])
+        return argv
@@ -0,0 +1,225 @@
+"""Shared results store: one SQLite database the tools append findings to.
+
+Tools open a ``ResultWriter`` for their run (``open_writer``), add one row per
+finding (live host, certificate name, artifact...) and close it with their
+exit status. Rows are buffered and written in batched transactions so large
+outputs cost a handful of commits. The console's ``results`` command queries
+the same database with ``ResultStore`` across every recorded run.
+
+Tools import this module optionally: when the CSAK package is not importable
+they simply skip the store. The database is used when a tool is given
+``--results-db`` or when ``CSAK_RESULTS_DB`` is set, which the console does
+with ``setg results on``.
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from csak import CSAK_HOME
+
+RESULTS_PATH = os.path.join(CSAK_HOME, "results.db")
+ENV_VAR = "CSAK_RESULTS_DB"
+BATCH_SIZE = 20000
+CACHE_KB = 64 * 1024
+
+# values compare case-insensitively so 'Example.COM' matches 'example.com'
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    tool TEXT NOT NULL,
+    argv TEXT NOT NULL,
+    started REAL NOT NULL,
+    finished REAL,
+    returncode INTEGER,
+    count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    ts REAL NOT NULL,
+    type TEXT NOT NULL,
+    value TEXT NOT NULL COLLATE NOCASE,
+    host TEXT COLLATE NOCASE,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_tool ON runs(tool, id);
+CREATE INDEX IF NOT EXISTS results_value ON results(value);
+CREATE INDEX IF NOT EXISTS results_type ON results(type, run_id);
+CREATE INDEX IF NOT EXISTS results_host ON results(host);
+CREATE INDEX IF NOT EXISTS results_ts ON results(ts);
+"""
+
+
+def connect(path):
+    """Open (creating if needed) the results database"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # several tools (e.g. batch jobs) may write at once: WAL lets readers carry
+    # on during a write and the timeout makes writers queue instead of failing
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    # keep the indexes' hot pages in memory while large batches are inserted
+    conn.execute(f"PRAGMA cache_size=-{CACHE_KB}")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class ResultWriter:
+    """Buffers one tool run's findings and writes them in batched transactions"""
+
+    def __init__(self, path, tool, argv, batch_size=BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.count = 0
+        self._pending = []
+        self._lock = threading.Lock()   # tools may report from worker threads
+        self._conn = connect(path)
+        with self._conn:
+            cur = self._conn.execute(
+                "INSERT INTO runs (tool, argv, started) VALUES (?, ?, ?)",
+                (tool, json.dumps(list(argv)), time.time()),
+            )
+        self.run_id = cur.lastrowid
+
+    def add(self, type, value, host=None, **data):
+        """Queue one finding; extra keyword arguments are stored as JSON"""
+        row = (self.run_id, time.time(), type, value, host,
+               json.dumps(data, default=str) if data else None)
+        with self._lock:
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO results (run_id, ts, type, value, host, data) VALUES (?, ?, ?, ?, ?, ?)",
+                self._pending,
+            )
+        self.count += len(self._pending)
+        self._pending = []
+
+    def flush(self):
+        """Write everything queued so far"""
+        with self._lock:
+            self._flush()
+
+    def close(self, returncode=0):
+        """Flush, record how the run ended and close the database"""
+        with self._lock:
+            if self._conn is None:
+                return
+            self._flush()
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE runs SET finished = ?, returncode = ?, count = ? WHERE id = ?",
+                    (time.time(), returncode, self.count, self.run_id),
+                )
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(0 if exc_type is None else 1)
+
+
+def open_writer(tool, path=None, argv=None):
+    """Return a ResultWriter for this run, or None when no store is configured.
+
+    path falls back to the CSAK_RESULTS_DB environment variable.
+    """
+    path = path or os.environ.get(ENV_VAR)
+    if not path:
+        return None
+    return ResultWriter(os.path.expanduser(path), tool, sys.argv[1:] if argv is None else argv)
+
+
+def _pattern(value):
+    """Translate a '*' wildcard into a LIKE pattern (None when there is none)"""
+    if "*" not in value:
+        return None
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped.replace("*", "%")
+
+
+class ResultStore:
+    """Read-side queries over the results database"""
+
+    def __init__(self, path=RESULTS_PATH):
+        self.path = path
+
+    def _query(self, sql, params=()):
+        if not os.path.exists(self.path):
+            return []
+        conn = connect(self.path)
+        conn.row_factory = sqlite3.Row
+        try:
+            return [dict(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+    def runs(self, tool=None, limit=20):
+        """Most recent runs first, optionally for one tool"""
+        where, params = ("WHERE tool = ?", [tool]) if tool else ("", [])
+        return self._query(
+            f"SELECT * FROM runs {where} ORDER BY id DESC LIMIT ?", [*params, limit]
+        )
+
+    def find(self, value, type=None, limit=50):
+        """Findings matching a value (case-insensitive, '*' as wildcard), newest first"""
+        pattern = _pattern(value)
+        if pattern is None:
+            match, params = "(r.value = ? OR r.host = ?)", [value, value]
+        else:
+            match, params = "(r.value LIKE ? ESCAPE '\\' OR r.host LIKE ? ESCAPE '\\')", [pattern, pattern]
+        if type:
+            match += " AND r.type = ?"
+            params.append(type)
+        return self._query(
+            "SELECT r.*, runs.tool FROM results r JOIN runs ON runs.id = r.run_id "
+            f"WHERE {match} ORDER BY r.ts DESC LIMIT ?",
+            [*params, limit],
+        )
+
+    def seen(self, value):
+        """Summary of a value (or host) across runs: first/last seen, runs and rows, or None"""
+        pattern = _pattern(value)
+        op, arg = ("LIKE ? ESCAPE '\\'", pattern) if pattern else ("= ?", value)
+        rows = self._query(
+            "SELECT MIN(ts) AS first, MAX(ts) AS last, COUNT(DISTINCT run_id) AS runs, "
+            f"COUNT(*) AS rows FROM results WHERE value {op} OR host {op}",
+            [arg, arg],
+        )
+        return rows[0] if rows and rows[0]["rows"] else None
+
+    def hosts(self, tool, type, scans=3):
+        """Hosts reported by the last `scans` finished runs of a tool.
+
+        Returns (run ids considered, rows of host/seen/last) with 'seen' the
+        number of those runs that reported the host, most consistent first.
+        """
+        run_ids = [r["id"] for r in self._query(
+            "SELECT id FROM runs WHERE tool = ? AND finished IS NOT NULL ORDER BY id DESC LIMIT ?",
+            [tool, scans],
+        )]
+        if not run_ids:
+            return run_ids, []
+        marks = ",".join("?" * len(run_ids))
+        rows = self._query(
+            "SELECT COALESCE(host, value) AS host, COUNT(DISTINCT run_id) AS seen, MAX(ts) AS last "
+            f"FROM results WHERE run_id IN ({marks}) AND type = ? "
+            "GROUP BY COALESCE(host, value) ORDER BY seen DESC, host",
+            [*run_ids, type],
+        )
+        return run_ids, rows
+
+    def types(self):
+        """Row counts per result type"""
+        return self._query("SELECT type, COUNT(*) AS rows FROM results GROUP BY type ORDER BY type")
@@ -0,0 +1,672 @@
+"""Interactive CSAK shell (cmd2). Imported lazily by console.py."""
+
+import json
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import threading
+import time
+from collections import deque
+import cmd2
+from colorama import Fore, Style, init
+
+from csak import SCRIPTS_DIR
+from csak.accounting import History, hotspots, profile_path, summarise
+from csak.capture import LAST_LOG, OutputCapture, grep_log
+from csak.engine import ENGINES, get_engine
+from csak.jobs import JobManager
+from csak.registry import ToolRegistry
+from csak.results import ENV_VAR as RESULTS_ENV, RESULTS_PATH, ResultStore
+
+# repository root, put on the tools' PYTHONPATH so they can import csak.results
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Initialize colorama
+init(autoreset=True)
+
+STATUS_INTERVAL = 0.2   # seconds between live status updates of a captured run
+SUMMARY_LINES = 10      # lines of captured output shown when a run ends
+
+class MyConsole(cmd2.Cmd):
+    """CSAK interactive console for module/script execution"""
+
+    def __init__(self):
+        super().__init__()
+
+        # Enable fluid shell-like tab completion
+        self.complete_includespace = True
+        self.complete_ignorecase = True
+
+        # Hide built-in commands (keep 'set' and 'show' visible)
+        self.hidden_commands.extend([
+            'alias', 'macro', 'run_script', 'run_pyscript',
+            'shortcuts', 'edit', 'shell'
+        ])
+
+        self.current_module = None
+        self.current_script = None
+        self.script_options = {}  # store user-set options
+        self.pipeline = []        # (module, script, options) stages for 'pipe'
+        self.registry = ToolRegistry(SCRIPTS_DIR)
+        self.tools_index = []     # (module, script) list
+        self.settings = {         # console settings, changed with 'setg'
+            'engine': 'subprocess',
+            'concurrency': os.cpu_count() or 1,
+            'history': 'on',       # record every run in .csak/history.jsonl
+            'profile': 'off',      # run foreground tools under cProfile
+            'results': 'on' if os.environ.get(RESULTS_ENV) else 'off',  # tools record findings
+            'capture': 'on',       # buffer foreground output instead of printing every line
+        }
+        # an inherited CSAK_RESULTS_DB also needs the package on the tools' path
+        self._share_results(self.settings['results'] == 'on')
+        self.last_output = None   # OutputCapture of the last captured run
+        self.engine = None
+        self._engine_lock = threading.Lock()
+        self.run_history = History()
+        self.jobs = JobManager(self.get_engine, self.settings['concurrency'],
+                               on_finish=self._record_job)
+        try:
+            self.refresh_tools()
+        except FileNotFoundError:
+            pass  # reported by 'list'
+        self.update_prompt()
+
+    def update_prompt(self):
+        """Update the shell prompt based on current context"""
+        if self.current_script:
+            self.prompt = (
+                f"CSAK (" f"{Fore.RED}{self.current_module}{Style.RESET_ALL}) - "
+                f"{Fore.RED}{self.current_script}{Style.RESET_ALL} > "
+            )
+        elif self.current_module:
+            self.prompt = (
+                f"CSAK (" f"{Fore.YELLOW}{self.current_module}{Style.RESET_ALL}) > "
+            )
+        else:
+            self.prompt = "CSAK > "
+
+    def refresh_tools(self):
+        """Re-validate the tool registry and rebuild the index used by 'use'"""
+        self.registry.refresh()
+        self.tools_index = self.registry.index
+
+    def do_list(self, args):
+        """List available modules and scripts with descriptions"""
+        try:
+            self.refresh_tools()
+        except FileNotFoundError:
+            self.perror(f"Scripts directory not found: {SCRIPTS_DIR}")
+            return
+        idx = 0
+        for module, info in self.registry.modules.items():
+            self.poutput(f"Module: {Fore.MAGENTA}{module}{Style.RESET_ALL} - {info['description']}")
+            for m, script in self.tools_index:
+                if m != module:
+                    continue
+                sdesc = self.registry.get(m, script)['description']
+                self.poutput(
+                    f"  [{Fore.GREEN}{idx}{Style.RESET_ALL}] "
+                    f"{Fore.CYAN}{script}{Style.RESET_ALL} - {sdesc}"
+                )
+                idx += 1
+            self.poutput("")
+
+    def do_use(self, arg):
+        """Select a tool by number or module/script name"""
+        arg = arg.strip()
+        if arg.isdigit():
+            i = int(arg)
+            try:
+                m, t = self.tools_index[i]
+            except Exception:
+                return self.perror(f"No such index {i}")
+        elif '/' in arg:
+            m, t = arg.split('/', 1)
+            if not self.registry.lookup(m, t):
+                return self.perror(f"No such tool {arg}")
+        else:
+            return self.perror("Usage: use <num> or use <module>/<tool>")
+        self.current_module, self.current_script = m, t
+        self.script_options.clear()
+        self.update_prompt()
+
+    def do_show(self, arg):
+        """Show options for the selected tool, or console settings"""
+        if arg.strip() == 'options':
+            return self._show_options()
+        if arg.strip() == 'settings':
+            for k, v in self.settings.items():
+                self.poutput(f"{k.ljust(12)} {v}")
+            return
+        self.perror("Usage: show options|settings")
+
+    def _show_options(self):
+        """Internal: display the option table for the current script"""
+        if not self.current_script:
+            return self.perror("No tool selected.")
+        if not self.registry.lookup(self.current_module, self.current_script):
+            return self.perror(f"Tool not found: {self.current_module}/{self.current_script}")
+        args = []
+        for key, opt in self.registry.options(self.current_module, self.current_script).items():
+            args.append({
+                'option': key,
+                'default': opt['default'],
+                'required': 'Yes' if opt['required'] else 'No',
+                'value': self.script_options.get(key, '')
+            })
+        cols = ['Option', 'Default', 'Required', 'Value']
+        widths = {c: len(c) for c in cols}
+        for a in args:
+            for c in cols:
+                widths[c] = max(widths[c], len(str(a[c.lower()])))
+        self.poutput('  '.join(c.ljust(widths[c]) for c in cols))
+        self.poutput('  '.join('-'*widths[c] for c in cols))
+        for a in args:
+            self.poutput('  '.join(str(a[c.lower()]).ljust(widths[c]) for c in cols))
+
+    def do_set(self, arg):
+        """Set a tool option. Use 'on/off' for boolean flags"""
+        parts = arg.split(None, 1)
+        if not parts:
+            return self.perror("Usage: set <option> [value]")
+        k = parts[0]
+        v = parts[1] if len(parts) > 1 else None
+        valid = self.registry.options(self.current_module or '', self.current_script or '')
+        if k not in valid:
+            return self.perror("Invalid option. show options")
+        if v and v.lower() in ('on','off'):
+            if v.lower()=='on': self.script_options[k]=None
+            else: self.script_options.pop(k,None)
+            return self.poutput(f"Set {k} = {v.lower()}")
+        self.script_options[k] = None if v is None else v
+        self.poutput(f"Set {k} = {v if v is not None else '<flag>'}")
+
+    def complete_set(self, text, line, begidx, endidx):
+        """Tab-complete option names, then file paths for file-like options"""
+        tokens = line[:begidx].split()
+        opts = self.registry.options(self.current_module or '', self.current_script or '')
+        if len(tokens) <= 1:
+            return [o for o in opts if o.startswith(text)]
+        if any(w in tokens[1] for w in ('file', 'output', 'path', 'dir')):
+            return self.path_complete(text, line, begidx, endidx)
+        return []
+
+    def do_setg(self, arg):
+        """Set a console setting, e.g. 'setg engine warm'. See 'show settings'"""
+        parts = arg.split(None, 1)
+        if len(parts) != 2 or parts[0] not in self.settings:
+            return self.perror(f"Usage: setg <{'|'.join(self.settings)}> <value>")
+        k, v = parts[0], parts[1].strip()
+        if k == 'engine':
+            if v not in ENGINES:
+                return self.perror(f"Unknown engine {v}. Choose from: {', '.join(ENGINES)}")
+            if v != self.settings['engine']:
+                self.close_engine()
+        elif k == 'concurrency':
+            if not v.isdigit() or int(v) < 1:
+                return self.perror("concurrency must be a positive integer")
+            v = self.jobs.concurrency = int(v)
+        elif k in ('history', 'profile', 'results', 'capture'):
+            if v.lower() not in ('on', 'off'):
+                return self.perror(f"{k} must be on or off")
+            v = v.lower()
+            if k == 'results':
+                self._share_results(v == 'on')
+        self.settings[k] = v
+        self.poutput(f"Set {k} = {v}")
+
+    def get_engine(self):
+        """Return the execution engine, starting it on first use"""
+        with self._engine_lock:
+            if self.engine is None:
+                self.engine = get_engine(self.settings['engine'], self.registry.imports())
+            return self.engine
+
+    def close_engine(self):
+        """Shut down the current execution engine (stops the warm server)"""
+        if self.engine is not None:
+            self.engine.close()
+            self.engine = None
+
+    def postcmd(self, stop, statement):
+        """Report background jobs that finished while the last command ran"""
+        for job in self.jobs.pop_finished():
+            colour = Fore.GREEN if job.state == 'done' else Fore.RED
+            self.poutput(
+                f"{colour}[job {job.id}] {job.tool} {job.state} "
+                f"(exit {job.returncode if job.error is None else job.error}){Style.RESET_ALL}"
+            )
+        return stop
+
+    def postloop(self):
+        stopped = self.jobs.kill_all()
+        if stopped:
+            self.poutput(f"Killed {stopped} running job(s)")
+        self.close_engine()
+
+    def do_run(self, args):
+        """Run the selected tool. 'run bg' runs it as a background job;
+        'run batch <option> <v1,v2,...|@file>' queues one job per value"""
+        if not self.current_script:
+            return self.perror("No tool selected.")
+        script_path = os.path.join(SCRIPTS_DIR, self.current_module, f"{self.current_script}.py")
+        tool = f"{self.current_module}/{self.current_script}"
+        parts = args.split(None, 2)
+        if parts and parts[0] == 'bg':
+            argv = self.registry.build_argv(self.current_module, self.current_script, self.script_options)
+            job = self.jobs.submit(tool, script_path, argv)
+            return self.poutput(f"[job {job.id}] {tool} queued, output -> {job.log_path}")
+        if parts and parts[0] == 'batch':
+            return self._run_batch(tool, script_path, parts[1:])
+        if parts:
+            return self.perror("Usage: run [bg | batch <option> <v1,v2,...|@file>]")
+        argv = self.registry.build_argv(self.current_module, self.current_script, self.script_options)
+        self.poutput(
+            f"{Fore.YELLOW}Running ({self.settings['engine']}): "
+            f"{' '.join([script_path, *argv])}{Style.RESET_ALL}"
+        )
+        profile = profile_path(tool) if self.settings['profile'] == 'on' else None
+        stdout = stderr = None
+        if self.settings['capture'] == 'on':
+            read_fd, stdout = os.pipe()
+            stderr = subprocess.STDOUT
+        started = time.perf_counter()
+        try:
+            proc = self.get_engine().start(script_path, argv, stdout=stdout, stderr=stderr, profile=profile)
+        except Exception as e:
+            if stdout is not None:
+                os.close(read_fd)
+            return self.perror(f"Error running tool: {e}")
+        finally:
+            if stdout is not None:
+                os.close(stdout)   # the child has its own copy
+        if stdout is not None:
+            self._watch(proc, OutputCapture(read_fd))
+        else:
+            try:
+                proc.wait()
+            except KeyboardInterrupt:
+                proc.kill()
+                proc.wait()
+        wall = time.perf_counter() - started
+        self._report_run(tool, argv, proc, wall, profile)
+
+    def _watch(self, proc, capture):
+        """Internal: wait for a captured run, showing a live status line, then its last lines"""
+        live = self.stdout.isatty()
+        try:
+            while True:
+                try:
+                    proc.wait(timeout=STATUS_INTERVAL)
+                    break
+                except subprocess.TimeoutExpired:
+                    if live:
+                        width = shutil.get_terminal_size().columns - 1
+                        self.stdout.write('\r\033[K' + capture.status(width))
+                        self.stdout.flush()
+        except KeyboardInterrupt:
+            proc.kill()
+            proc.wait()
+        if live:
+            self.stdout.write('\r\033[K')
+        # processes the tool started may still hold the pipe open
+        if not capture.join(timeout=2):
+            self.perror("Output still open after the tool exited; capture continues in the background")
+        self.last_output = capture
+        tail = capture.tail(SUMMARY_LINES)
+        earlier = capture.line_count - len(tail)
+        if earlier > 0:
+            self.poutput(f"{Fore.CYAN}... {earlier:,} earlier lines in {capture.log_path} "
+                         f"('output grep <pattern>' or 'output page'){Style.RESET_ALL}")
+        for line in tail:
+            self.poutput(line)
+
+    def do_output(self, args):
+        """Show the last run's captured output ('setg capture on'):
+        output [N]            last N lines (default 20)
+        output grep <regex>   matching lines of the full output
+        output page           page through the full output"""
+        action, _, rest = args.strip().partition(' ')
+        path = self.last_output.log_path if self.last_output else LAST_LOG
+        if not os.path.exists(path):
+            return self.perror("No captured output yet.")
+        if not action or action.isdigit():
+            n = int(action or 20)
+            buffered = self.last_output.lines if self.last_output else ()
+            if n == 0:
+                lines = []
+            elif n <= len(buffered):
+                lines = list(buffered)[-n:]
+            else:
+                # more than the ring buffer holds: stream the tail of the spool
+                with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                    lines = [line.rstrip('\n') for line in deque(f, maxlen=n)]
+            for line in lines:
+                self.poutput(line)
+        elif action == 'grep' and rest.strip():
+            try:
+                matches = list(grep_log(path, rest.strip()))
+            except re.error as e:
+                return self.perror(f"Bad pattern: {e}")
+            for number, line in matches:
+                self.poutput(f"{Fore.GREEN}{number}{Style.RESET_ALL}: {line}")
+            self.poutput(f"{len(matches)} matching line(s)" + (" (limit reached)" if len(matches) >= 200 else ""))
+        elif action == 'page' and not rest:
+            pager = shlex.split(os.environ.get('PAGER') or 'less -R')
+            if self.stdout.isatty() and shutil.which(pager[0]):
+                subprocess.call([*pager, path])
+            else:
+                # no pager: stream the spool rather than loading it all into memory
+                with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                    shutil.copyfileobj(f, self.stdout)
+        else:
+            self.perror("Usage: output [N | grep <regex> | page]")
+
+    def complete_output(self, text, line, begidx, endidx):
+        """Tab-complete output sub-commands"""
+        if len(line[:begidx].split()) > 1:
+            return []
+        return [a for a in ('grep', 'page') if a.startswith(text)]
+
+    def _usage_summary(self, proc, wall):
+        """Internal: 'in 1.23s (exit 0, cpu 1.10s, peak 45.2MB)' for a finished process"""
+        usage = proc.usage or {}
+        details = [f"exit {proc.returncode}"]
+        if usage:
+            details += [f"cpu {usage['cpu_s']:.2f}s", f"peak {usage['maxrss_mb']:.1f}MB"]
+        colour = Fore.GREEN if proc.returncode == 0 else Fore.RED
+        return f"{colour}in {wall:.2f}s ({', '.join(details)}){Style.RESET_ALL}"
+
+    def _report_run(self, tool, argv, proc, wall, profile):
+        """Internal: print and record the resource usage of a foreground run"""
+        self.poutput(f"Finished {self._usage_summary(proc, wall)}")
+        if profile and os.path.exists(profile):
+            self.poutput(hotspots(profile))
+            self.poutput(f"Profile saved to {profile}")
+        if self.settings['history'] == 'on':
+            self.run_history.record(tool, argv, self.settings['engine'], proc.returncode, wall,
+                                    proc.usage, profile=profile if profile and os.path.exists(profile) else None)
+
+    def _record_job(self, job):
+        """Internal: JobManager callback recording finished background jobs"""
+        if self.settings['history'] == 'on' and job.error is None:
+            self.run_history.record(job.tool, job.argv, self.settings['engine'], job.returncode,
+                                    job.elapsed, job.usage, mode='bg')
+
+    def do_pipe(self, args):
+        """Stream tools into each other: pipe add | show | run | del <n> | clear.
+        'pipe add' appends the selected tool with its current options. Set an
+        output option to '-' to feed the next stage and an input option to '-'
+        to read the previous one; all stages run at the same time"""
+        parts = args.split()
+        action = parts[0] if parts else 'show'
+        if action == 'add' and len(parts) == 1:
+            if not self.current_script:
+                return self.perror("No tool selected.")
+            self.pipeline.append((self.current_module, self.current_script, dict(self.script_options)))
+            self.poutput(f"Stage {len(self.pipeline)}: {self.current_module}/{self.current_script}")
+            if len(self.pipeline) > 1 and '-' not in self.script_options.values():
+                self.poutput("Hint: set this tool's input option to '-' to read the previous stage")
+        elif action == 'show' and len(parts) <= 1:
+            if not self.pipeline:
+                return self.poutput("Pipeline is empty. Select a tool, set its options, then 'pipe add'.")
+            for i, (m, t, options) in enumerate(self.pipeline, 1):
+                argv = self.registry.build_argv(m, t, options)
+                self.poutput(f"  [{Fore.GREEN}{i}{Style.RESET_ALL}] {Fore.CYAN}{m}/{t}{Style.RESET_ALL} {' '.join(argv)}")
+        elif action == 'run' and len(parts) == 1:
+            self._run_pipeline()
+        elif action == 'del' and len(parts) == 2 and parts[1].isdigit():
+            i = int(parts[1])
+            if not 1 <= i <= len(self.pipeline):
+                return self.perror(f"No stage {i}")
+            m, t, _ = self.pipeline.pop(i - 1)
+            self.poutput(f"Removed stage {i}: {m}/{t}")
+        elif action == 'clear' and len(parts) == 1:
+            self.pipeline.clear()
+            self.poutput("Pipeline cleared")
+        else:
+            self.perror("Usage: pipe add | show | run | del <n> | clear")
+
+    def complete_pipe(self, text, line, begidx, endidx):
+        """Tab-complete pipe sub-commands"""
+        if len(line[:begidx].split()) > 1:
+            return []
+        return [a for a in ('add', 'show', 'run', 'del', 'clear') if a.startswith(text)]
+
+    def _run_pipeline(self):
+        """Internal: start every stage connected by OS pipes and wait for all of them"""
+        if not self.pipeline:
+            return self.perror("Pipeline is empty.")
+        stages = []
+        for m, t, options in self.pipeline:
+            if not self.registry.lookup(m, t):
+                return self.perror(f"Tool not found: {m}/{t}")
+            stages.append((f"{m}/{t}", os.path.join(SCRIPTS_DIR, m, f"{t}.py"),
+                           self.registry.build_argv(m, t, options)))
+        self.poutput(
+            f"{Fore.YELLOW}Running pipeline ({self.settings['engine']}): "
+            f"{' | '.join(tool for tool, _, _ in stages)}{Style.RESET_ALL}"
+        )
+        started = time.perf_counter()
+        procs = []
+        upstream = None    # read end of the pipe from the previous stage
+        try:
+            engine = self.get_engine()
+            for i, (tool, script, argv) in enumerate(stages):
+                read_fd = write_fd = None
+                if i < len(stages) - 1:
+                    read_fd, write_fd = os.pipe()
+                try:
+                    procs.append(engine.start(script, argv, stdin=upstream, stdout=write_fd))
+                finally:
+                    # the children hold their own copies; ours must go so EOF and
+                    # broken pipes propagate between stages
+                    for fd in (upstream, write_fd):
+                        if fd is not None:
+                            os.close(fd)
+                    upstream = read_fd
+        except Exception as e:
+            if upstream is not None:
+                os.close(upstream)
+            for proc in procs:
+                proc.kill()
+                proc.wait()
+            return self.perror(f"Error starting pipeline: {e}")
+
+        ends = [None] * len(procs)
+        try:
+            while None in ends:
+                for i, proc in enumerate(procs):
+                    if ends[i] is None and proc.poll() is not None:
+                        ends[i] = time.perf_counter() - started
+                if ends[-1] is not None:
+                    # nothing reads the earlier stages' output any more
+                    for i, proc in enumerate(procs):
+                        if ends[i] is None:
+                            proc.terminate()
+                time.sleep(0.05)
+        except KeyboardInterrupt:
+            for proc in procs:
+                proc.kill()
+            for i, proc in enumerate(procs):
+                proc.wait()
+                if ends[i] is None:
+                    ends[i] = time.perf_counter() - started
+
+        for i, ((tool, _, argv), proc, wall) in enumerate(zip(stages, procs, ends), 1):
+            self.poutput(f"[{i}] {tool} finished {self._usage_summary(proc, wall)}")
+            if self.settings['history'] == 'on':
+                self.run_history.record(tool, argv, self.settings['engine'], proc.returncode, wall,
+                                        proc.usage, mode='pipe')
+
+    def _run_batch(self, tool, script_path, parts):
+        """Internal: queue one background job per value of a single option"""
+        if len(parts) != 2:
+            return self.perror("Usage: run batch <option> <v1,v2,...|@file>")
+        option, spec = parts
+        if option not in self.registry.options(self.current_module, self.current_script):
+            return self.perror("Invalid option. show options")
+        if spec.startswith('@'):
+            try:
+                with open(os.path.expanduser(spec[1:])) as f:
+                    values = [l.strip() for l in f if l.strip() and not l.startswith('#')]
+            except OSError as e:
+                return self.perror(f"Cannot read values: {e}")
+        else:
+            values = [v.strip() for v in spec.split(',') if v.strip()]
+        for value in values:
+            options = dict(self.script_options, **{option: value})
+            argv = self.registry.build_argv(self.current_module, self.current_script, options)
+            job = self.jobs.submit(tool, script_path, argv)
+            self.poutput(f"[job {job.id}] {tool} {option}={value}")
+        self.poutput(
+            f"Queued {len(values)} job(s), at most {self.jobs.concurrency} at a time. "
+            f"Output in {self.jobs.jobs_dir}"
+        )
+
+    def do_jobs(self, args):
+        """List background jobs with their state, exit code and log file"""
+        if not self.jobs.jobs:
+            return self.poutput("No jobs.")
+        rows = [(str(j.id), j.tool, j.state, '' if j.returncode is None else str(j.returncode),
+                 f"{j.elapsed:.1f}s", j.log_path) for j in self.jobs.jobs.values()]
+        self._print_table(('ID', 'Tool', 'State', 'Exit', 'Elapsed', 'Log'), rows)
+
+    def _print_table(self, cols, rows):
+        """Internal: print rows of strings as left-aligned columns"""
+        widths = [max([len(c), *(len(r[i]) for r in rows)]) for i, c in enumerate(cols)]
+        self.poutput('  '.join(c.ljust(w) for c, w in zip(cols, widths)))
+        self.poutput('  '.join('-'*w for w in widths))
+        for r in rows:
+            self.poutput('  '.join(v.ljust(w) for v, w in zip(r, widths)))
+
+    def _share_results(self, enabled):
+        """Internal: point tools started from now on at the results store (or not)"""
+        if not enabled:
+            os.environ.pop(RESULTS_ENV, None)
+            return
+        os.environ.setdefault(RESULTS_ENV, os.path.abspath(RESULTS_PATH))
+        paths = [p for p in os.environ.get('PYTHONPATH', '').split(os.pathsep) if p]
+        if ROOT not in paths:
+            os.environ['PYTHONPATH'] = os.pathsep.join([ROOT, *paths])
+
+    def do_results(self, args):
+        """Query findings recorded by the tools ('setg results on'):
+        results runs [module/tool]   recent runs
+        results find <value> [type]  where a value (or host) was seen; '*' is a wildcard
+        results hosts [N]            hosts live in the last N icmp-rangescan runs (default 3)
+        results types                finding counts per type"""
+        parts = args.split()
+        action = parts[0] if parts else 'runs'
+        store = ResultStore(os.environ.get(RESULTS_ENV) or RESULTS_PATH)
+        when = lambda ts: time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts)) if ts else ''
+        if action == 'runs' and len(parts) <= 2:
+            runs = store.runs(parts[1] if len(parts) == 2 else None)
+            if not runs:
+                return self.poutput("No results recorded. Turn recording on with 'setg results on'.")
+            rows = [(str(r['id']), when(r['started']), r['tool'],
+                     '' if r['returncode'] is None else str(r['returncode']), str(r['count']),
+                     ' '.join(json.loads(r['argv']))) for r in runs]
+            self._print_table(('Run', 'Started', 'Tool', 'Exit', 'Findings', 'Arguments'), rows)
+        elif action == 'find' and len(parts) in (2, 3):
+            value = parts[1]
+            found = store.find(value, parts[2] if len(parts) == 3 else None)
+            if not found:
+                return self.poutput(f"{value} has not been seen.")
+            seen = store.seen(value)
+            if seen:
+                self.poutput(f"{value}: {seen['rows']} finding(s) in {seen['runs']} run(s), "
+                             f"first {when(seen['first'])}, last {when(seen['last'])}")
+            rows = [(when(r['ts']), str(r['run_id']), r['tool'], r['type'], r['value'], r['host'] or '')
+                    for r in found]
+            self._print_table(('When', 'Run', 'Tool', 'Type', 'Value', 'Host'), rows)
+        elif action == 'hosts' and len(parts) <= 2 and (len(parts) == 1 or parts[1].isdigit()):
+            scans = int(parts[1]) if len(parts) == 2 else 3
+            run_ids, hosts = store.hosts('Network/icmp-rangescan', 'live_host', max(1, scans))
+            if not run_ids:
+                return self.poutput("No icmp-rangescan runs recorded.")
+            self.poutput(f"Live hosts in runs {', '.join(map(str, run_ids))}:")
+            rows = [(h['host'], f"{h['seen']}/{len(run_ids)}", when(h['last'])) for h in hosts]
+            self._print_table(('Host', 'Seen', 'Last seen'), rows)
+        elif action == 'types' and len(parts) == 1:
+            self._print_table(('Type', 'Findings'), [(t['type'], str(t['rows'])) for t in store.types()])
+        else:
+            self.perror("Usage: results [runs [module/tool] | find <value> [type] | hosts [N] | types]")
+
+    def complete_results(self, text, line, begidx, endidx):
+        """Tab-complete results sub-commands and tool names"""
+        tokens = line[:begidx].split()
+        if len(tokens) <= 1:
+            return [a for a in ('runs', 'find', 'hosts', 'types') if a.startswith(text)]
+        if tokens[1] == 'runs' and len(tokens) == 2:
+            return [o for o in (f"{m}/{t}" for m, t in self.tools_index) if o.startswith(text)]
+        return []
+
+    def do_stats(self, args):
+        """Show run timings: 'stats' per tool, 'stats <module>/<tool>' for recent runs, 'stats clear'"""
+        arg = args.strip()
+        if arg == 'clear':
+            self.run_history.clear()
+            return self.poutput("Run history cleared")
+        runs = self.run_history.load(arg or None)
+        if not runs:
+            return self.poutput("No runs recorded." if not arg else f"No runs recorded for {arg}.")
+        fmt = lambda v, unit, digits=2: '' if v is None else f"{v:.{digits}f}{unit}"
+        if arg:
+            rows = [(r['ts'], r['mode'], r['engine'], str(r['returncode']), fmt(r['wall_s'], 's'),
+                     fmt(r['cpu_s'], 's'), fmt(r['maxrss_mb'], 'MB', 1), ' '.join(r['argv']))
+                    for r in runs[-20:]]
+            return self._print_table(('When', 'Mode', 'Engine', 'Exit', 'Wall', 'CPU', 'Peak RSS', 'Arguments'), rows)
+        rows = [(s['tool'], str(s['runs']), str(s['failed']), fmt(s['mean_s'], 's'), fmt(s['median_s'], 's'),
+                 fmt(s['max_s'], 's'), fmt(s['cpu_s'], 's'), fmt(s['maxrss_mb'], 'MB', 1), s['last'])
+                for s in summarise(runs)]
+        self._print_table(('Tool', 'Runs', 'Failed', 'Mean', 'Median', 'Max', 'CPU', 'Peak RSS', 'Last run'), rows)
+
+    def complete_stats(self, text, line, begidx, endidx):
+        """Tab-complete module/script names and 'clear'"""
+        opts = ['clear'] + [f"{m}/{t}" for m, t in self.tools_index]
+        return [o for o in opts if o.startswith(text)]
+
+    def _job_ids(self, args):
+        """Internal: parse job ids from a command argument, None for 'all'/empty"""
+        ids = args.split()
+        if not ids or ids == ['all']:
+            return None
+        if not all(i.isdigit() for i in ids):
+            raise ValueError("job ids must be numbers")
+        return [int(i) for i in ids]
+
+    def do_kill(self, args):
+        """Kill background jobs: kill <id> [id ...] | kill all"""
+        if not args.strip():
+            return self.perror("Usage: kill <id> [id ...] | kill all")
+        try:
+            ids = self._job_ids(args)
+        except ValueError as e:
+            return self.perror(str(e))
+        if ids is None:
+            return self.poutput(f"Killed {self.jobs.kill_all()} job(s)")
+        for i in ids:
+            if self.jobs.kill(i):
+                self.poutput(f"[job {i}] killed")
+            else:
+                self.perror(f"No active job {i}")
+
+    def do_wait(self, args):
+        """Wait for background jobs to finish: wait [id ...] (Ctrl-C stops waiting)"""
+        try:
+            ids = self._job_ids(args)
+        except ValueError as e:
+            return self.perror(str(e))
+        try:
+            self.jobs.wait(ids)
+        except KeyboardInterrupt:
+            self.poutput("Stopped waiting; jobs keep running in the background")
+
+    def complete_use(self, text, line, begidx, endidx):
+        """Tab-complete tool indices or module/script names"""
+        opts = [str(i) for i in range(len(self.tools_index))]
+        opts += [f"{m}/{t}" for m, t in self.tools_index]
+        return [o for o in opts if o.startswith(text)]
@@ -2,29 +2,67 @@
 
 import os
 import argparse
+import csv
+import glob
+import gzip
+import io
 import re
+import shutil
+import sys
+import tempfile
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
 
-# define arguments
-parser = argparse.ArgumentParser(
-    description="Defangs a given artifact or multiple in a plain text file."
-)
-parser.add_argument('artifact', nargs='*')
-parser.add_argument('-f', '--file',help="Input file containing artifacts",required=False)
-parser.add_argument('-o', '--output', help="Output file containing defanged artifacts", required=False)
-parser.add_argument('-r', '--replace-file',help="If an input file is declared this will overwrite the artifacts with the defanged values.", action="store_true", required=False)
-parser.add_argument('-v', '--verbose', help="Enable verbose output", action="store_true")
-args = parser.parse_args()
+try:
+    from csak.results import open_writer
+except ImportError:  # run outside the CSAK tree: no shared results store
+    open_writer = None
+
+# read/write buffer for large files
+BUFFER_SIZE = 1 << 20
+GZIP_MAGIC = b'\x1f\x8b'
+STDIO = '-'    # file name meaning standard input/output
 
-# global list for results
-output_data = []
+# Possessive quantifiers stop the engine backtracking through words that turn
+# out not to be artifacts. They need Python 3.11+; each is followed by a
+# character its class cannot match, so on older versions plain greedy
+# quantifiers find exactly the same artifacts.
+POSSESSIVE = '+' if sys.version_info >= (3, 11) else ''
 
 # regex patterns
-ip_regex     = r'((25[0-5]|(2[0-4]|1\d|[1-9]|)\d)\.?\b){4}'
-uri_regex    = r'\b[a-zA-Z][a-zA-Z0-9+.-]*:\/\/[^\s/$.?#].[^\s]*'
-email_regex  = r'\b[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\b'
+octet        = r'(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)'
+ip_regex     = rf'\b(?:{octet}\.){{3}}{octet}\b'
+uri_regex    = rf'\b[a-zA-Z][a-zA-Z0-9+.-]*{POSSESSIVE}:\/\/[^\s/$.?#].[^\s]*'
+email_regex  = rf'\b[a-zA-Z0-9._%+-]+{POSSESSIVE}@[a-zA-Z0-9.-]+\.[a-zA-Z]{{2,}}\b'
 domain_regex = (
     r'(?<!@)(?<!:\/\/)(?<!\.)'  # not email or URI or prefixed by dot
-    r'\b(?:[a-zA-Z0-9-]+\.)+[a-zA-Z]{2,}\b(?!\/)'
+    rf'\b(?:[a-zA-Z0-9-]+{POSSESSIVE}\.)+[a-zA-Z]{{2,}}{POSSESSIVE}\b(?!\/)'
+)
+
+# One compiled scanner for all artifact types. At each position the
+# alternatives are tried in this order, so a URI wins over the domain or IP
+# inside it and an email over its domain; finditer then walks the line once,
+# left to right, returning non-overlapping matches. Every artifact starts at a
+# word boundary and has a '.', '@' or ':' before its first other non-word
+# character, so the guard skips plain words without trying each alternative.
+#
+# A match is only tried at the start of a run of word characters joined by
+# '.', '-', '%' or '+' (allowing one such character in front), not at every
+# word inside it: the alternatives and the guard scan to the end of the run,
+# so trying each word of a long run like 'a-a-a-...' took quadratic time.
+# Artifacts glued to a preceding word, such as the IP in 'x-10.0.0.1', are
+# therefore not split out of it.
+RUN_START = r'\b(?:(?<![\w%+.-])|(?<=(?<![\w%+.-])[%+.-]))'
+ARTIFACT_PATTERNS = [
+    ('URI', uri_regex),
+    ('Email', email_regex),
+    ('IP', ip_regex),
+    ('Domain', domain_regex),
+]
+artifact_regex = re.compile(
+    rf'{RUN_START}(?=[\w%+-]*{POSSESSIVE}[.@:])(?:'
+    + '|'.join(f'(?P<{typ}>{regex})' for typ, regex in ARTIFACT_PATTERNS)
+    + ')'
 )
 
 # defang function
@@ -45,50 +83,397 @@ def defang(text: str, art_type: str) -> str:
         return text.replace('.', '[.]')
     return text
 
-# artifact detection
-def detect_artifacts(line: str):
-    text = line.strip()
-    if not text:
-        return
-    for regex, typ in [
-        (ip_regex, 'IP'),
-        (uri_regex, 'URI'),
-        (email_regex, 'Email'),
-        (domain_regex, 'Domain')
-    ]:
-        match = re.search(regex, text)
-        if match:
-            original = match.group()
-            defanged = defang(original, typ.lower())
-            print(f"[!] Found {typ} artifact: {original} -> {defanged}")
-            output_data.append({
-                'type': typ,
-                'original': original,
-                'defanged': defanged
-            })
-
-# process input
-if args.file:
-    path = os.path.expanduser(args.file)
-    with open(path) as f:
-        for line in f:
-            detect_artifacts(line)
-else:
-    for art in args.artifact:
-        detect_artifacts(art)
-
-# write output file
-if args.output:
-    outpath = os.path.expanduser(args.output)
-    with open(outpath, 'w') as f:
-        for item in output_data:
-            f.write(
-                f"Type: {item['type']} | Original: {item['original']} | Defanged: {item['defanged']}\n"
+def find_artifacts(text: str):
+    """Return every artifact in text as (type, start, end, value), in order"""
+    return [(m.lastgroup, m.start(), m.end(), m.group()) for m in artifact_regex.finditer(text)]
+
+def defang_line(line: str):
+    """Return the line with every artifact defanged, plus [(type, original, defanged)]"""
+    found = []
+    pieces = []
+    pos = 0
+    for m in artifact_regex.finditer(line):
+        typ, original = m.lastgroup, m.group()
+        defanged = defang(original, typ.lower())
+        found.append((typ, original, defanged))
+        pieces += (line[pos:m.start()], defanged)
+        pos = m.end()
+    if not found:
+        return line, found
+    pieces.append(line[pos:])
+    return ''.join(pieces), found
+
+def is_gzip(path: str) -> bool:
+    with open(path, 'rb') as f:
+        return f.read(2) == GZIP_MAGIC
+
+def open_text(path: str, mode: str, compressed: bool = False):
+    """Open a text file for streaming; gzip when compressed. Line endings and
+    undecodable bytes pass through unchanged. '-' is stdin/stdout (gzip input
+    is detected from its magic bytes); closing it leaves the descriptor open."""
+    if path == STDIO:
+        raw = open(0 if mode == 'r' else 1, mode + 'b', buffering=BUFFER_SIZE, closefd=False)
+        if mode == 'r' and raw.peek(2)[:2] == GZIP_MAGIC:
+            compressed, path = True, raw
+        else:
+            return io.TextIOWrapper(raw, encoding='utf-8', errors='surrogateescape', newline='')
+    if compressed:
+        return gzip.open(path, mode + 't', compresslevel=6, encoding='utf-8', errors='surrogateescape', newline='')
+    return open(path, mode, encoding='utf-8', errors='surrogateescape', newline='', buffering=BUFFER_SIZE)
+
+def process_lines(lines, emit=None, rewrite=None):
+    """Defang an iterable of lines, streaming results; returns per-type counts.
+
+    emit(type, original, defanged) is called for each artifact as it is found
+    and the defanged text goes to rewrite, so memory use does not grow with
+    the input.
+    """
+    counts = Counter()
+    for line in lines:
+        new_line, found = defang_line(line)
+        if rewrite is not None:
+            rewrite.write(new_line)
+        for typ, original, defanged in found:
+            counts[typ] += 1
+            if emit is not None:
+                emit(typ, original, defanged)
+    return counts
+
+def artifact_host(typ: str, value: str):
+    """The host an artifact refers to: itself for IPs and domains, the host part of URIs and emails"""
+    if typ == 'URI':
+        # scheme://[user@]host[:port]/... without urlsplit's validation overhead
+        netloc = re.split(r'[/?#]', value.partition('://')[2], maxsplit=1)[0].rpartition('@')[2]
+        return netloc.partition(']')[0].lstrip('[') if netloc.startswith('[') else netloc.partition(':')[0]
+    if typ == 'Email':
+        return value.rpartition('@')[2]
+    return value
+
+def make_emitter(report=None, quiet=False, out=None, store=None):
+    """Return an emit callback that prints (to out, default stdout), reports and/or stores each artifact"""
+    def emit(typ, original, defanged):
+        if not quiet:
+            print(f"[!] Found {typ} artifact: {original} -> {defanged}", file=out)
+        if report is not None:
+            report.write(f"Type: {typ} | Original: {original} | Defanged: {defanged}\n")
+        if store is not None:
+            store.add(typ.lower(), original, host=artifact_host(typ, original))
+    return emit
+
+def atomic_writer(path: str, compressed: bool):
+    """Return (temp path, text stream) in the target's directory for os.replace"""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.defang-')
+    os.close(fd)
+    return tmp, open_text(tmp, 'w', compressed)
+
+def commit_replace(path: str, tmp: str):
+    """Move a finished temp file over the original, keeping its permissions"""
+    shutil.copymode(path, tmp)
+    os.replace(tmp, path)
+
+class Tee:
+    """Write the same text to several streams"""
+
+    def __init__(self, streams):
+        self.streams = streams
+
+    def write(self, text):
+        for stream in self.streams:
+            stream.write(text)
+
+def defang_file(path, emit=None, rewrite=None, replace=False):
+    """Stream one input file, writing the defanged text to rewrite and/or
+    replacing the file in place (atomically, via a temp file + rename)."""
+    compressed = path != STDIO and is_gzip(path)
+    tmp = stream = None
+    try:
+        if replace:
+            tmp, stream = atomic_writer(path, compressed)
+            rewrite = stream if rewrite is None else Tee([rewrite, stream])
+        with open_text(path, 'r', compressed) as src:
+            counts = process_lines(src, emit, rewrite)
+    except BaseException:
+        if stream is not None:
+            stream.close()
+            os.remove(tmp)
+        raise
+    if stream is not None:
+        stream.close()
+        commit_replace(path, tmp)
+    return counts
+
+# -- multi-file / parallel mode ---------------------------------------------
+
+def expand_inputs(specs, exclude=()):
+    """Expand files, globs and directories (recursively) into an ordered list of files.
+
+    Files whose real path is in exclude (our own outputs) are left out, so a
+    directory is never read while we write into it.
+    """
+    exclude = {os.path.realpath(p) for p in exclude}
+    paths = []
+    for spec in specs:
+        if spec == STDIO:
+            paths.append(spec)
+            continue
+        spec = os.path.expanduser(spec)
+        if os.path.exists(spec):
+            matches = [spec]
+        else:
+            matches = sorted(glob.glob(spec, recursive=True))
+            if not matches:
+                raise FileNotFoundError(f"No such file or pattern: {spec}")
+        for match in matches:
+            if os.path.isdir(match):
+                for root, dirs, files in os.walk(match):
+                    dirs.sort()
+                    paths += [os.path.join(root, f) for f in sorted(files)]
+            else:
+                paths.append(match)
+    return [p for p in dict.fromkeys(paths) if p == STDIO or os.path.realpath(p) not in exclude]
+
+def split_file(path: str, chunk_size: int):
+    """Split a plain file into (start, end) byte ranges ending on line boundaries"""
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, 'rb') as f:
+        while bounds[-1] + chunk_size < size:
+            f.seek(bounds[-1] + chunk_size)
+            f.readline()
+            if f.tell() >= size:
+                break
+            bounds.append(f.tell())
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+def read_range(path: str, start: int, end, compressed: bool):
+    """Yield decoded lines from a byte range of a file (the whole file if gzip)"""
+    opener = gzip.open(path, 'rb') if compressed else open(path, 'rb', buffering=BUFFER_SIZE)
+    with opener as f:
+        if not compressed:
+            f.seek(start)
+        pos = start
+        for raw in f:
+            yield raw.decode('utf-8', 'surrogateescape')
+            pos += len(raw)
+            if end is not None and pos >= end:
+                break
+
+def defang_chunk(path, start, end, compressed, keep_text, spool_dir=None):
+    """Pool worker: defang one byte range, spooling results to temp files in spool_dir.
+
+    Returns (counts, artifacts spool, text spool); the spools are read back by
+    the parent in input order and then deleted.
+    """
+    fd, arts_path = tempfile.mkstemp(dir=spool_dir, prefix='.defang-', suffix='.tsv')
+    text_path = None
+    text = None
+    with open(fd, 'w', encoding='utf-8', errors='surrogateescape', newline='') as arts:
+        if keep_text:
+            text_fd, text_path = tempfile.mkstemp(dir=spool_dir, prefix='.defang-')
+            text = open(text_fd, 'w', encoding='utf-8', errors='surrogateescape', newline='', buffering=BUFFER_SIZE)
+        try:
+            emit = lambda typ, original, defanged: arts.write(f"{typ}\t{original}\t{defanged}\n")
+            counts = process_lines(read_range(path, start, end, compressed), emit, text)
+        finally:
+            if text is not None:
+                text.close()
+    return counts, arts_path, text_path
+
+def replay_spools(arts_path, text_path, emit, rewrite):
+    """Feed a chunk's spooled artifacts and text to the parent's outputs, then delete them"""
+    with open(arts_path, encoding='utf-8', errors='surrogateescape', newline='') as arts:
+        for record in arts:
+            emit(*record.rstrip('\n').split('\t'))
+    os.remove(arts_path)
+    if text_path:
+        if rewrite is not None:
+            with open(text_path, encoding='utf-8', errors='surrogateescape', newline='') as text:
+                shutil.copyfileobj(text, rewrite, BUFFER_SIZE)
+        os.remove(text_path)
+
+def iter_units(paths, chunk_size):
+    """Yield (path, start, end, compressed, last chunk of the file) work units"""
+    for path in paths:
+        compressed = is_gzip(path)
+        ranges = [(0, None)] if compressed else split_file(path, chunk_size)
+        for i, (start, end) in enumerate(ranges):
+            yield path, start, end, compressed, i == len(ranges) - 1
+
+def defang_parallel(paths, emit, write=None, replace=False, jobs=None, chunk_size=64 << 20,
+                    spool_dir=None):
+    """Defang many files across a process pool; outputs are reassembled in input order.
+
+    Plain files larger than chunk_size are split on line boundaries so a single
+    big file also uses every worker. At most two chunks per worker are in
+    progress or waiting to be replayed, so spooled output stays bounded by
+    about 2 * jobs * chunk_size. Spools go to spool_dir, by default next to
+    each input file. Returns {path: counts}.
+    """
+    keep_text = write is not None or replace
+    jobs = jobs or os.cpu_count() or 1
+    units = iter_units(paths, chunk_size)
+
+    per_file = {path: Counter() for path in paths}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = deque()   # (unit, future) in input order
+
+        def submit_next():
+            unit = next(units, None)
+            if unit is not None:
+                path, start, end, compressed, _ = unit
+                chunk_dir = spool_dir or os.path.dirname(os.path.abspath(path))
+                pending.append((unit, pool.submit(defang_chunk, path, start, end, compressed,
+                                                  keep_text, chunk_dir)))
+
+        tmp = stream = None
+        try:
+            for _ in range(2 * jobs):
+                submit_next()
+            while pending:
+                # stays queued until replayed so a failure below still cleans it up
+                (path, _, _, compressed, last), future = pending[0]
+                counts, arts_path, text_path = future.result()
+                per_file[path].update(counts)
+                if replace and stream is None:
+                    tmp, stream = atomic_writer(path, compressed)
+                targets = [t for t in (write, stream) if t is not None]
+                rewrite = targets[0] if len(targets) == 1 else Tee(targets) if targets else None
+                replay_spools(arts_path, text_path, emit, rewrite)
+                if last and stream is not None:
+                    stream.close()
+                    commit_replace(path, tmp)
+                    tmp = stream = None
+                pending.popleft()
+                submit_next()
+        except BaseException:
+            futures = [future for _, future in pending]
+            for future in futures:
+                future.cancel()
+            # drop spools of chunks that finished but were never replayed
+            for future in futures:
+                if future.done() and not future.cancelled() and future.exception() is None:
+                    for spool in future.result()[1:]:
+                        if spool and os.path.exists(spool):
+                            os.remove(spool)
+            if stream is not None:
+                stream.close()
+                os.remove(tmp)
+            raise
+    return per_file
+
+def print_summary(counts, out=None):
+    total = sum(counts.values())
+    detail = ', '.join(f"{typ}: {n}" for typ, n in sorted(counts.items()))
+    print(f"[+] {total} artifacts defanged" + (f" ({detail})" if detail else ""), file=out)
+
+def write_summary(path, per_file):
+    """Write artifact counts per file and type as CSV"""
+    types = [typ for typ, _ in ARTIFACT_PATTERNS]
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['file', *types, 'total'])
+        for name, counts in per_file.items():
+            writer.writerow([name, *(counts[t] for t in types), sum(counts.values())])
+
+def main():
+    # define arguments
+    parser = argparse.ArgumentParser(
+        description="Defangs a given artifact or multiple in a plain text file."
+    )
+    parser.add_argument('artifact', nargs='*')
+    parser.add_argument('-f', '--file', nargs='+', action='extend', help="Input files, globs or directories containing artifacts (plain or gzip); '-' reads standard input", required=False)
+    parser.add_argument('-o', '--output', help="Output file listing each artifact found and its defanged value ('-' for standard output)", required=False)
+    parser.add_argument('-w', '--write', help="Write the input with every artifact defanged to this file (.gz to compress, '-' for standard output)", required=False)
+    parser.add_argument('-r', '--replace-file',help="If an input file is declared this will overwrite the artifacts with the defanged values.", action="store_true", required=False)
+    parser.add_argument('-q', '--quiet', help="Do not print each artifact, only the summary", action="store_true")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help="Worker processes for multiple or large files (default: CPU count)")
+    parser.add_argument('--chunk-size', type=int, default=64, help="Split plain files larger than this many MB across workers (default: 64)")
+    parser.add_argument('--spool-dir', help="Directory for parallel mode's temporary chunk output (default: next to the -w/-o output, or the file being replaced)", required=False)
+    parser.add_argument('-s', '--summary', help="Write artifact counts per file and type to this CSV file", required=False)
+    parser.add_argument('-v', '--verbose', help="Enable verbose output", action="store_true")
+    parser.add_argument('--results-db', help="Also record every artifact in this CSAK results database (default: $CSAK_RESULTS_DB)", required=False)
+    args = parser.parse_args()
+    if args.replace_file and args.file and STDIO in args.file:
+        parser.error("-r cannot replace standard input")
+    if args.output == STDIO and args.write == STDIO:
+        parser.error("only one of -o and -w can write to standard output")
+    if args.spool_dir and not os.path.isdir(args.spool_dir):
+        parser.error(f"--spool-dir {args.spool_dir} is not a directory")
+    # when stdout carries data, progress and summaries go to stderr
+    log = sys.stderr if STDIO in (args.output, args.write) else sys.stdout
+    # expand the inputs before any output is created, leaving our own files out
+    outputs = [os.path.expanduser(p) for p in (args.output, args.write, args.summary) if p and p != STDIO]
+    results_db = args.results_db or os.environ.get('CSAK_RESULTS_DB')
+    if results_db:
+        results_db = os.path.expanduser(results_db)
+        outputs += [results_db + suffix for suffix in ('', '-wal', '-shm', '-journal')]
+    paths = []
+    if args.file:
+        for spec in args.file:
+            if spec != STDIO and os.path.realpath(os.path.expanduser(spec)) in map(os.path.realpath, outputs):
+                parser.error(f"{spec} is both an input and an output")
+        try:
+            paths = expand_inputs(args.file, outputs)
+        except FileNotFoundError as e:
+            parser.error(str(e))
+
+    report = None
+    if args.output:
+        report = open_text(os.path.expanduser(args.output), 'w', args.output.endswith('.gz'))
+    write = None
+    if args.write:
+        write = open_text(os.path.expanduser(args.write), 'w', args.write.endswith('.gz'))
+    store = None
+    if open_writer is not None:
+        store = open_writer('Administration/defanger', args.results_db)
+    elif results_db:
+        print("[!] Results store unavailable: put the CSAK directory on PYTHONPATH", file=sys.stderr)
+    emit = make_emitter(report, args.quiet, log, store)
+    broken = False
+    status = 1
+    try:
+        # process input
+        if args.file:
+            chunk_size = max(1, args.chunk_size) << 20
+            parallel = (args.jobs or 1) > 1 and STDIO not in paths and (
+                len(paths) > 1 or any(os.path.getsize(p) > chunk_size for p in paths)
             )
+            if parallel:
+                # spool on the destination's filesystem rather than a possibly
+                # RAM-backed system temp directory
+                spool_dir = args.spool_dir
+                if spool_dir is None and not args.replace_file:
+                    dest = next((d for d in (args.write, args.output) if d and d != STDIO), None)
+                    spool_dir = os.path.dirname(os.path.abspath(os.path.expanduser(dest))) if dest else os.getcwd()
+                per_file = defang_parallel(paths, emit, write, args.replace_file, args.jobs, chunk_size,
+                                           spool_dir)
+            else:
+                per_file = {p: defang_file(p, emit, write, args.replace_file) for p in paths}
+            if len(per_file) > 1:
+                for name, counts in per_file.items():
+                    print(f"    {name}: {sum(counts.values())} artifacts", file=log)
+            print_summary(sum(per_file.values(), Counter()), log)
+            if args.summary:
+                write_summary(os.path.expanduser(args.summary), per_file)
+        else:
+            process_lines((art + '\n' for art in args.artifact), emit, write)
+        status = 0
+    except BrokenPipeError:
+        broken = True
+    finally:
+        if store is not None:
+            store.close(status)
+        for stream in (report, write):
+            if stream is not None:
+                try:
+                    stream.close()
+                except BrokenPipeError:
+                    broken = True
+    if broken:
+        # the reader of our stdout went away (e.g. the next pipeline stage exited)
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
 
-# optional in-place replace
-if args.replace_file and args.file:
-    path = os.path.expanduser(args.file)
-    with open(path, 'w') as f:
-        for item in output_data:
-            f.write(item['defanged'] + '\n')
+if __name__ == "__main__":
+    sys.exit(main())
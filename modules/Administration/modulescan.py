@@ -3,8 +3,25 @@
 import os
 import ast
 import sys
+import json
+import fnmatch
 import argparse
 import importlib.metadata
+from concurrent.futures import ProcessPoolExecutor
+
+CACHE_VERSION = 2
+CACHE_PATH = os.path.join(os.environ.get("CSAK_HOME", ".csak"), "modulescan.json")
+INDEX_VERSION = 1
+INDEX_PATH = os.path.join(os.environ.get("CSAK_HOME", ".csak"), "modulescan-index.json")
+
+# directories that never hold the project's own code
+DEFAULT_EXCLUDES = [
+    ".git", ".hg", ".svn", ".tox", ".nox", "__pycache__", "node_modules",
+    "site-packages", "dist-packages", "venv", ".venv", "env", ".env",
+]
+
+# below this many files to parse, a process pool costs more than it saves
+PARALLEL_THRESHOLD = 32
 
 def get_imports_from_file(filepath):
     """Extract imported modules from a given Python file."""
@@ -16,11 +33,18 @@ def get_imports_from_file(filepath):
         if isinstance(node, ast.Import):
             for alias in node.names:
                 imports.add(alias.name.split('.')[0])
-        elif isinstance(node, ast.ImportFrom) and node.module:
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
             imports.add(node.module.split('.')[0])
 
     return imports
 
+def parse_file(filepath):
+    """Return (imports, error) for a file; errors are returned instead of raised so one bad file cannot stop a scan."""
+    try:
+        return sorted(get_imports_from_file(filepath)), None
+    except (SyntaxError, ValueError, UnicodeDecodeError, OSError) as e:
+        return [], f"{type(e).__name__}: {e}"
+
 def get_standard_library_modules():
     """Returns a set of standard library modules."""
     if hasattr(sys, "stdlib_module_names"):  # Python 3.10+
@@ -30,44 +54,241 @@ def get_standard_library_modules():
     std_libs = set(sys.builtin_module_names)
     return std_libs
 
-def get_installed_packages():
-    """Returns a set of installed package names using importlib.metadata."""
-    return {pkg.metadata["Name"].lower() for pkg in importlib.metadata.distributions()}
+def site_signature():
+    """Identify the installed package set: the interpreter plus the mtime of every sys.path directory.
 
-def scan_directory(directory):
-    """Scans a directory for Python files and extracts external dependencies."""
-    all_imports = set()
-    for root, _, files in os.walk(directory):
+    Installing or removing a distribution touches its site-packages directory,
+    which changes the signature and invalidates the index.
+    """
+    dirs = []
+    for entry in sys.path:
+        entry = os.path.abspath(entry or ".")
+        if os.path.isdir(entry):
+            dirs.append([entry, os.stat(entry).st_mtime_ns])
+    return {"executable": sys.executable, "paths": dirs}
+
+def build_distribution_index():
+    """Map each top-level import name to the [distribution, version] pairs that provide it."""
+    versions = {}
+    for dist in importlib.metadata.distributions():
+        name = dist.metadata["Name"]
+        if name:
+            versions.setdefault(name.lower(), [name, dist.version])
+    index = {}
+    for module, dists in importlib.metadata.packages_distributions().items():
+        index[module] = [versions[d.lower()] for d in dict.fromkeys(dists) if d.lower() in versions]
+    # distributions without file records still resolve when imported by their own name
+    for key, pair in versions.items():
+        index.setdefault(key.replace("-", "_"), [pair])
+    return index
+
+def get_distribution_index(path=INDEX_PATH, use_cache=True):
+    """Return the import-to-distribution index, rebuilding it only when site-packages changed."""
+    signature = site_signature()
+    if use_cache:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION and data.get("signature") == signature:
+                return data["index"]
+        except (OSError, ValueError, KeyError):
+            pass
+    index = build_distribution_index()
+    if use_cache:
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp = f"{path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": INDEX_VERSION, "signature": signature, "index": index}, f)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+    return index
+
+def is_excluded(name, relpath, patterns):
+    """Check a directory's name and path relative to the scan root against the exclude patterns."""
+    return any(fnmatch.fnmatch(name, p) or fnmatch.fnmatch(relpath, p) for p in patterns)
+
+def find_python_files(directory, excludes=()):
+    """Yield every .py file under directory, pruning excluded directories and virtualenvs."""
+    if os.path.isfile(directory):
+        yield directory
+        return
+    for root, dirs, files in os.walk(directory):
+        kept = []
+        for d in dirs:
+            path = os.path.join(root, d)
+            relpath = os.path.relpath(path, directory).replace(os.sep, "/")
+            # a pyvenv.cfg marks a virtualenv whatever it is called
+            if is_excluded(d, relpath, excludes) or os.path.isfile(os.path.join(path, "pyvenv.cfg")):
+                continue
+            kept.append(d)
+        dirs[:] = kept
         for file in files:
             if file.endswith(".py"):
-                file_path = os.path.join(root, file)
-                all_imports.update(get_imports_from_file(file_path))
+                yield os.path.join(root, file)
+
+class ScanCache:
+    """Per-file import sets keyed by absolute path, invalidated by mtime and size."""
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.files = {}
+        self.dirty = False
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                self.files = data.get("files", {})
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def stat_key(filepath):
+        st = os.stat(filepath)
+        return [st.st_mtime_ns, st.st_size]
+
+    def get(self, filepath, stat):
+        entry = self.files.get(filepath)
+        if entry and entry["stat"] == stat:
+            return entry
+        return None
+
+    def put(self, filepath, stat, imports, error):
+        self.files[filepath] = {"stat": stat, "imports": imports, "error": error}
+        self.dirty = True
+
+    def prune(self, directory, seen):
+        """Forget cached files under directory that were not found by this scan."""
+        prefix = os.path.join(os.path.abspath(directory), "")
+        for filepath in [f for f in self.files if f.startswith(prefix) and f not in seen]:
+            del self.files[filepath]
+            self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "files": self.files}, f)
+            os.replace(tmp, self.path)
+            self.dirty = False
+        except OSError:
+            pass  # the cache is only an optimisation
+
+def scan_directory(directory, excludes=DEFAULT_EXCLUDES, jobs=None, cache=None):
+    """Scans a directory for Python files and extracts external dependencies.
+
+    Unchanged files are served from the cache; the rest are parsed across a
+    process pool. Files that fail to parse are reported on stderr and skipped.
+    """
+    all_imports = set()
+    local_names = set()
+    errors = {}
+    pending = {}
+    seen = set()
+    for file_path in find_python_files(directory, excludes):
+        file_path = os.path.abspath(file_path)
+        try:
+            stat = ScanCache.stat_key(file_path)
+        except OSError as e:
+            errors[file_path] = str(e)
+            continue
+        seen.add(file_path)
+        local_names.update(local_module_names(directory, file_path))
+        entry = cache.get(file_path, stat) if cache else None
+        if entry is None:
+            pending[file_path] = stat
+            continue
+        all_imports.update(entry["imports"])
+        if entry["error"]:
+            errors[file_path] = entry["error"]
+
+    paths = list(pending)
+    jobs = jobs or os.cpu_count() or 1
+    if jobs > 1 and len(paths) >= PARALLEL_THRESHOLD:
+        with ProcessPoolExecutor(jobs) as pool:
+            results = list(pool.map(parse_file, paths, chunksize=max(1, len(paths) // (jobs * 4))))
+    else:
+        results = [parse_file(p) for p in paths]
+
+    for file_path, (imports, error) in zip(paths, results):
+        all_imports.update(imports)
+        if error:
+            errors[file_path] = error
+        if cache:
+            cache.put(file_path, pending[file_path], imports, error)
+
+    if cache:
+        cache.prune(directory, seen)
+        cache.save()
+    for file_path, error in sorted(errors.items()):
+        print(f"Skipped {file_path}: {error}", file=sys.stderr)
+    print(f"Scanned {len(seen)} files ({len(paths)} parsed, {len(seen) - len(paths)} cached, {len(errors)} skipped).")
+    return all_imports, local_names
+
+def local_module_names(directory, file_path):
+    """The top-level name a file is imported by from the scan root: its own stem or its top package.
 
-    return all_imports
+    Nested modules are only importable through their package (or relatively),
+    so a wrapper such as pkg/cache/requests.py does not hide the real requests.
+    """
+    relpath = os.path.relpath(file_path, os.path.abspath(directory))
+    parts = [] if relpath == os.curdir or relpath.startswith(os.pardir) else relpath.split(os.sep)
+    if not parts:
+        return {os.path.splitext(os.path.basename(file_path))[0]}
+    return {os.path.splitext(parts[0])[0]}
 
-def write_requirements(imports, output_file):
-    """Writes the extracted packages to a requirements.txt file."""
+def write_requirements(imports, output_file, index=None, local_names=()):
+    """Writes the extracted packages to a requirements.txt file, pinned to the installed versions."""
     standard_libs = get_standard_library_modules()
-    installed_packages = get_installed_packages()
+    if index is None:
+        index = get_distribution_index()
 
-    external_packages = sorted(imports - standard_libs)
+    for name in sorted((imports - standard_libs) & set(local_names)):
+        print(f"Note: '{name}' is a module of the scanned tree, not listed as a requirement", file=sys.stderr)
+    external_packages = sorted(imports - standard_libs - set(local_names))
+    requirements = {}
+    for package in external_packages:
+        dists = index.get(package)
+        if not dists:
+            print(f"Warning: no installed distribution provides '{package}'", file=sys.stderr)
+            continue
+        for name, version in dists:
+            requirements[name.lower()] = f"{name}=={version}"
 
-    with open(output_file, "w", encoding="utf-8") as file:
-        for package in external_packages:
-            if package in installed_packages:
-                file.write(f"{package}\n")
+    # '-' writes to file descriptor 1 directly; main() points sys.stdout at stderr
+    stream = open(1, "w", encoding="utf-8", closefd=False) if output_file == "-" else open(output_file, "w", encoding="utf-8")
+    with stream as file:
+        for _, requirement in sorted(requirements.items()):
+            file.write(f"{requirement}\n")
     
-    print(f"Generated {output_file} with {len(external_packages)} packages.")
+    print(f"Generated {output_file} with {len(requirements)} packages.")
 
 def main():
     parser = argparse.ArgumentParser(description="Scan Python files for imported modules and generate a requirements.txt file.")
     parser.add_argument("--directory",type=str,default=None,help="Directory to scan modules in python files.", required=True)
-    parser.add_argument("--output",type=str,default=requirements.txt ,help="Output file name (default: ./requirements.txt).")
+    parser.add_argument("--output",type=str,default="requirements.txt" ,help="Output file name, or '-' for standard output (default: ./requirements.txt).")
+    parser.add_argument("--exclude",type=str,nargs="+",action="extend",default=[],help="Directory names or relative path globs to skip, on top of the defaults.")
+    parser.add_argument("--no-default-excludes",action="store_true",help=f"Also scan {', '.join(DEFAULT_EXCLUDES)}.")
+    parser.add_argument("--jobs",type=int,default=os.cpu_count(),help="Worker processes used to parse files (default: CPU count).")
+    parser.add_argument("--cache",type=str,default=CACHE_PATH,help=f"Per-file import cache (default: {CACHE_PATH}).")
+    parser.add_argument("--no-cache",action="store_true",help="Parse every file and rebuild the distribution index instead of reusing cached results.")
 
     args = parser.parse_args()
 
-    imports = scan_directory(args.directory)
-    write_requirements(imports, args.output)
+    if args.output == "-":
+        sys.stdout = sys.stderr  # keep progress out of the requirements stream
+    if not os.path.exists(args.directory):
+        print(f"Error: {args.directory} does not exist.", file=sys.stderr)
+        return 1
+    excludes = args.exclude + ([] if args.no_default_excludes else DEFAULT_EXCLUDES)
+    cache = None if args.no_cache else ScanCache(args.cache)
+    imports, local_names = scan_directory(args.directory, excludes, args.jobs, cache)
+    index = get_distribution_index(use_cache=not args.no_cache)
+    write_requirements(imports, args.output, index, local_names)
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
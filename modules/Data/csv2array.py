@@ -2,46 +2,292 @@
 
 
 import argparse
-import pandas as pd
-import numpy as np
+import csv
+import io
+import math
+import os
+import re
+import sys
+import tempfile
+from collections import deque
+from itertools import islice
 
+# in-memory size of each per-column spool before it moves to disk
+SPOOL_SIZE = 1 << 20
 
 
-def csv_to_kql_dynamic_array(csv_file, row_index=None, column_name=None):
+def open_csv(csv_file):
+    """Open a CSV for streaming; '-' reads standard input"""
+    if csv_file == '-':
+        return io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8-sig', newline='')
+    return open(csv_file, encoding='utf-8-sig', newline='')
+
+
+# plain decimal notation only: int()/float() would also accept '1_0' and ' 12 '
+INT_RE = re.compile(r'[+-]?\d+')
+NUMBER_RE = re.compile(r'[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?')
+
+
+class ValueType:
+    """Infers the type of a whole column the way pandas does.
+
+    Values stay strings unless every non-empty one is a number; a column of
+    integers with gaps becomes float like pandas' NaN-holding columns.
+    """
+
+    def __init__(self):
+        self.numbers = True
+        self.ints = True
+        self.missing = False
+
+    def update(self, value):
+        if value == '':
+            self.missing = True
+        elif self.numbers and not INT_RE.fullmatch(value):
+            self.ints = False
+            self.numbers = NUMBER_RE.fullmatch(value) is not None
+
+    def convert(self, value):
+        if not self.numbers:
+            return value
+        if self.ints and not self.missing:
+            return int(value)
+        number = float(value)
+        return number if math.isfinite(number) else value
+
+
+def spool_values(spool):
+    """Read back the raw values written to a column spool"""
+    spool.seek(0)
+    for record in csv.reader(spool):
+        yield record[0]
+
+
+def kql_literal(value):
+    """Render a value as a KQL scalar: numbers bare, strings quoted and escaped"""
+    if isinstance(value, (int, float)):
+        return repr(value)
+    escaped = (
+        value.replace('\\', '\\\\').replace("'", "\\'")
+        .replace('\n', '\\n').replace('\r', '\\r').replace('\t', '\\t')
+    )
+    return f"'{escaped}'"
+
+
+def kql_name(text):
+    """Turn a column name into a valid KQL identifier for let statements"""
+    name = re.sub(r'\W', '_', text).strip('_') or 'values'
+    return f"_{name}" if name[0].isdigit() else name
+
+
+class KqlArrayWriter:
+    """Streams values into one or more KQL dynamic() literals.
+
+    A new literal is started whenever adding the next value would push the
+    current one past max_chars (0 = no limit), so large IOC lists stay under
+    query size limits. With a name, literals are written as let statements
+    (name_1, name_2, ... when split).
+    """
+
+    def __init__(self, out, name=None, max_chars=0, colour=False):
+        self.out = out
+        self.name = name
+        self.max_chars = max_chars
+        self.colour = colour
+        self.literals = 0
+        self.values = 0
+        self._length = 0
+        self._items = 0
+
+    def _open(self):
+        self.literals += 1
+        head = 'dynamic(['
+        if self.name:
+            suffix = f"_{self.literals}" if self.max_chars else ''
+            head = f"let {self.name}{suffix} = {head}"
+        if self.colour:
+            self.out.write('\033[92m')
+        self.out.write(head)
+        self._length = len(head)
+        self._items = 0
+
+    def _close(self):
+        tail = ']);' if self.name else '])'
+        self.out.write(tail + ('\033[0m' if self.colour else '') + '\n')
+
+    def add(self, value):
+        item = kql_literal(value)
+        closing = 3 if self.name else 2
+        if not self.literals:
+            self._open()
+        elif self.max_chars and self._length + 2 + len(item) + closing > self.max_chars:
+            self._close()
+            self._open()
+        if self._items:
+            item = ', ' + item
+        self.out.write(item)
+        self._length += len(item)
+        self._items += 1
+        self.values += 1
+
+    def close(self):
+        if not self.literals:
+            self._open()
+        self._close()
+
+
+def unique(values):
+    """Drop repeated values, keeping first-seen order"""
+    seen = set()
+    for value in values:
+        if value not in seen:
+            seen.add(value)
+            yield value
+
+
+def read_row(reader, row_index, kinds=None):
+    """Return one data row, skipping earlier rows without keeping them.
+
+    With a kinds list, every row is read and fed to one ValueType per column
+    (added as needed) so the row's values can be typed by their columns.
+    """
+    if kinds is not None:
+        reader = _typed(reader, kinds)
+    if row_index < 0:
+        tail = deque(reader, maxlen=-row_index)
+        if len(tail) < -row_index:
+            raise IndexError(f"Row {row_index} is out of range")
+        return tail[0]
+    row = next(islice(reader, row_index, None), None)
+    if row is None:
+        raise IndexError(f"Row {row_index} is out of range")
+    if kinds is not None:
+        deque(reader, maxlen=0)   # the remaining rows still count towards the types
+    return row
+
+
+def _typed(reader, kinds):
+    for row in reader:
+        if len(row) > len(kinds):
+            kinds.extend(ValueType() for _ in range(len(row) - len(kinds)))
+        for kind, value in zip(kinds, row):
+            kind.update(value)
+        yield row
+
+
+def column_indexes(header, column_names):
+    """Map requested column names to their positions in the header"""
+    missing = [c for c in column_names if c not in header]
+    if missing:
+        raise KeyError(', '.join(missing))
+    return [header.index(c) for c in column_names]
+
+
+def csv_to_kql_dynamic_array(csv_file, row_index=None, column_names=None, output=None,
+                             max_chars=0, let=False, dedupe=True):
+    """Stream a CSV row or columns into KQL dynamic() literals.
+
+    Columns are read in one pass; each column's literals are spooled (in
+    memory up to SPOOL_SIZE, then on disk) and written out in the order the
+    columns were requested. Returns the number of values written, or None on
+    error.
+    """
+    out = None
     try:
-        # Read CSV file
-        df = pd.read_csv(csv_file)
+        # '-' writes bare KQL to stdout for piping; None adds the banner for reading
+        out = sys.stdout if output in (None, '-') else open(output, 'w', encoding='utf-8')
+        colour = output is None and sys.stdout.isatty()
+        # Stream the CSV; only the requested row or column values are handled
+        with open_csv(csv_file) as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
 
-        if row_index is not None:
-            row_values = df.iloc[row_index].dropna().apply(lambda x: int(x) if isinstance(x, (np.int64, np.int32)) else x).tolist()
-        elif column_name is not None:
-            row_values = df[column_name].dropna().tolist()
+            if output is None:
+                print("\nGenerated KQL dynamic array:\n")
+            if row_index is not None:
+                # like pandas, each value takes the type of its whole column
+                kinds = [ValueType() for _ in header]
+                row = read_row(reader, row_index, kinds)
+                values = [kind.convert(v) for kind, v in zip(kinds, row) if v != '']
+                name = kql_name(f"row_{row_index}") if let else None
+                writers = [KqlArrayWriter(out, name, max_chars, colour)]
+                for value in (unique(values) if dedupe else values):
+                    writers[0].add(value)
+                writers[0].close()
+            elif column_names:
+                indexes = column_indexes(header, column_names)
+                # a column's type is only known after its last value, so the raw
+                # values are spooled and rendered once the file has been read
+                spools = [tempfile.SpooledTemporaryFile(SPOOL_SIZE, 'w+', encoding='utf-8', newline='')
+                          for _ in indexes]
+                spool_writers = [csv.writer(spool) for spool in spools]
+                kinds = [ValueType() for _ in indexes]
+                seen = [set() for _ in indexes]
+                for row in reader:
+                    for idx, spool_writer, kind, known in zip(indexes, spool_writers, kinds, seen):
+                        value = row[idx] if idx < len(row) else ''
+                        kind.update(value)
+                        if value == '':
+                            continue
+                        if dedupe:
+                            if value in known:
+                                continue
+                            known.add(value)
+                        spool_writer.writerow([value])
+                seen = None
+                writers = []
+                for spool, kind, c in zip(spools, kinds, column_names):
+                    writer = KqlArrayWriter(out, kql_name(c) if let else None, max_chars, colour)
+                    values = (kind.convert(v) for v in spool_values(spool))
+                    # '1' and '1.0' are the same number once converted
+                    for value in (unique(values) if dedupe and kind.numbers else values):
+                        writer.add(value)
+                    writer.close()
+                    spool.close()
+                    writers.append(writer)
+            else:
+                raise ValueError("Either row_index or column_name must be provided")
+
+        total = sum(w.values for w in writers)
+        if output is None:
+            print("\n")
         else:
-            raise ValueError("Either row_index or column_name must be provided")
-        
-        # Convert to KQL dynamic array format
-        kql_array = f'dynamic({row_values})'
-        print("\nGenerated KQL dynamic array:\n")
-        print(f"\033[92m{kql_array}\033[0m\n\n")
-        return kql_array
+            literals = sum(w.literals for w in writers)
+            destination = "standard output" if output == '-' else output
+            print(f"Wrote {total} values in {literals} KQL literal(s) to {destination}",
+                  file=sys.stderr if output == '-' else sys.stdout)
+        return total
+    except BrokenPipeError:
+        # the reader of standard output went away (e.g. the next pipeline stage)
+        os.dup2(os.open(os.devnull, os.O_WRONLY), 1)
+        return None
     except Exception as e:
-        print(f"Error: {e}")
+        print(f"Error: {e}", file=sys.stderr if output == '-' else sys.stdout)
         return None
+    finally:
+        if out is not None and out is not sys.stdout:
+            out.close()
     
 
 def main():
     parser = argparse.ArgumentParser(description="Convert a CSV row or column to a KQL dynamic array.")
-    parser.add_argument("file", type=str, help="Path to CSV file.", required=True)
+    parser.add_argument("file", type=str, help="Path to CSV file ('-' for standard input).")
     parser.add_argument("-row", type=int, help="Row ID to extract.", default=None)
-    parser.add_argument("-column", type=str, help="Column name to extract.", default=None)
+    parser.add_argument("-column", type=str, nargs="+", action="extend", help="Column name(s) to extract.", default=None)
+    parser.add_argument("-output", type=str, help="Write the KQL to this file instead of the screen ('-' for bare KQL on standard output).", default=None)
+    parser.add_argument("-max-chars", type=int, help="Split into several literals so none exceeds this many characters (default: no limit).", default=0)
+    parser.add_argument("-let", action="store_true", help="Emit 'let <column> = dynamic([...]);' statements.")
+    parser.add_argument("-keep-duplicates", action="store_true", help="Keep repeated values instead of de-duplicating.")
 
     args = parser.parse_args()
 
     if args.row is None and args.column is None:
         print("Error: Either a row index (-r) or column name (-c) must be supplied.")
-        return
+        return 1
     
-    csv_to_kql_dynamic_array(args.csv_file, args.row, args.column)
+    total = csv_to_kql_dynamic_array(args.file, args.row, args.column, args.output,
+                                     args.max_chars, args.let, not args.keep_duplicates)
+    return 1 if total is None else 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
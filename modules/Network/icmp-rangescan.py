@@ -1,41 +1,199 @@
 """Sends ICMP requests to hosts on a network range to determine which hosts are online"""
 
 import argparse
+import hashlib
 import ipaddress
+import json
+import os
+import select
+import socket
+import struct
 import sys
 import subprocess
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait as wait_futures
 from colorama import Fore, Style, init
 
+try:
+    from csak.results import open_writer
+except ImportError:  # run outside the CSAK tree: no shared results store
+    open_writer = None
+
 init(autoreset=True)
 
 parser = argparse.ArgumentParser()
-parser.add_argument('-r', '--range', dest="range", help="Network Range X.X.X.X/X", required=True)
-parser.add_argument('-o', '--output', dest="output", help="Output file for live hosts")
+parser.add_argument('-r', '--range', dest="range", nargs='+', action='extend', help="Network Range X.X.X.X/X (several may be given)")
+parser.add_argument('-R', '--range-file', dest="range_file", help="File of network ranges, one per line ('-' reads standard input)")
+parser.add_argument('-x', '--exclude', dest="exclude", nargs='+', action='extend', help="Ranges or addresses to skip")
+parser.add_argument('-X', '--exclude-file', dest="exclude_file", help="File of ranges or addresses to skip, one per line")
+parser.add_argument('-c', '--checkpoint', dest="checkpoint", help="Checkpoint file; an interrupted scan resumes from it when re-run with the same targets")
+parser.add_argument('-o', '--output', dest="output", help="Output file for live hosts ('-' writes them to standard output)")
 parser.add_argument('-v', '--verbose', dest="verbose", help="Verbose output", action='store_true')
+parser.add_argument('-w', '--workers', dest="workers", type=int, default=64, help="Maximum pings in flight at once for the ping engine (default: 64)")
+parser.add_argument('-t', '--timeout', dest="timeout", type=int, default=1, help="Seconds to wait for each reply (default: 1)")
+parser.add_argument('--retries', dest="retries", type=int, default=0, help="Extra attempts for hosts that do not reply (default: 0)")
+parser.add_argument('-e', '--engine', dest="engine", choices=["ping", "socket"], default="ping", help="ping: fork the ping command per host; socket: send echo requests from this process (IPv4)")
+parser.add_argument('--rate', dest="rate", type=int, default=1000, help="Echo requests per second for the socket engine (default: 1000)")
+parser.add_argument('--max-inflight', dest="max_inflight", type=int, default=None, help="Unanswered echo requests allowed at once for the socket engine (default: rate x timeout)")
+parser.add_argument('--results-db', dest="results_db", help="Also record live hosts in this CSAK results database (default: $CSAK_RESULTS_DB)")
 args = parser.parse_args()
 
 is_windows = sys.platform.startswith("win")
 
-live_hosts = []
+live_hosts = set()
+
+CHECKPOINT_INTERVAL = 2.0   # seconds between checkpoint writes
+
+
+def read_ranges(path):
+    """Read ranges from a file: one or more per line, '#' starts a comment"""
+    ranges = []
+    with (open(0, closefd=False) if path == '-' else open(os.path.expanduser(path))) as f:
+        for line in f:
+            ranges += line.split('#', 1)[0].replace(',', ' ').split()
+    return ranges
+
+
+def network_span(cidr, hosts_only=True):
+    """Return (version, first, last) integer bounds of a range.
+
+    With hosts_only the bounds match ipaddress' hosts(): the network (and for
+    IPv4 the broadcast) address is dropped unless the range is /31 or smaller.
+    """
+    try:
+        network = ipaddress.ip_network(cidr, strict=False)
+    except ValueError:
+        raise ValueError(cidr) from None
+    first, last = int(network.network_address), int(network.broadcast_address)
+    if hosts_only and network.num_addresses > 2:
+        first += 1
+        if network.version == 4:
+            last -= 1
+    return network.version, first, last
+
+
+def merge_intervals(spans):
+    """Sort and coalesce overlapping or adjacent [first, last] intervals"""
+    merged = []
+    for first, last in sorted(spans):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], last)
+        else:
+            merged.append([first, last])
+    return merged
+
+
+def subtract_intervals(intervals, excluded):
+    """Remove merged `excluded` intervals from merged `intervals`"""
+    result = []
+    j = 0
+    for first, last in intervals:
+        while j < len(excluded) and excluded[j][1] < first:
+            j += 1
+        cur = first
+        for ex_first, ex_last in excluded[j:]:
+            if ex_first > last:
+                break
+            if ex_first > cur:
+                result.append([cur, ex_first - 1])
+            cur = max(cur, ex_last + 1)
+        if cur <= last:
+            result.append([cur, last])
+    return result
+
+
+def build_targets(ranges, excludes=()):
+    """Merge ranges into a set of (version, first, last) intervals minus exclusions.
+
+    Overlapping ranges collapse so no address is scanned twice; IPv4 targets
+    come before IPv6, each in ascending address order.
+    """
+    targets = []
+    for version in (4, 6):
+        spans = [s[1:] for s in map(network_span, ranges) if s[0] == version]
+        skip = [s[1:] for s in (network_span(x, hosts_only=False) for x in excludes) if s[0] == version]
+        for first, last in subtract_intervals(merge_intervals(spans), merge_intervals(skip)):
+            targets.append((version, first, last))
+    return targets
+
 
+def iter_targets(targets, start=0):
+    """Yield (position, ip) for every target address from position `start` on"""
+    pos = 0
+    for version, first, last in targets:
+        size = last - first + 1
+        if start < pos + size:
+            address = ipaddress.IPv4Address if version == 4 else ipaddress.IPv6Address
+            for n in range(first + max(0, start - pos), last + 1):
+                yield pos + n - first, str(address(n))
+        pos += size
 
-def cidr_to_ips(cidr, strict=False):
-    network = ipaddress.ip_network(cidr, strict=strict)
-    for ip in network.hosts():
-        yield str(ip)
+
+class Checkpoint:
+    """Tracks scan progress as the count of leading target positions completed.
+
+    Results arrive out of order, so positions finished ahead of the low-water
+    mark are held until the gap closes. Only the mark is persisted; a resumed
+    scan may repeat the few hosts that were in flight.
+    """
+
+    def __init__(self, path, signature, done=0):
+        self.path = path
+        self.signature = signature
+        self.done = done
+        self.finished = set()
+        self.saved_at = time.monotonic()
+
+    @staticmethod
+    def load(path, signature):
+        """Return the resume position stored at path for these targets, or 0"""
+        if not path or not os.path.exists(path):
+            return 0
+        try:
+            with open(path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if state.get("targets") != signature:
+            print(f"{Fore.YELLOW}[!] Checkpoint {path} is for different targets; starting over{Style.RESET_ALL}")
+            return 0
+        return int(state.get("done", 0))
+
+    def complete(self, pos):
+        self.finished.add(pos)
+        while self.done in self.finished:
+            self.finished.remove(self.done)
+            self.done += 1
+        if time.monotonic() - self.saved_at >= CHECKPOINT_INTERVAL:
+            self.save()
+
+    def save(self):
+        self.saved_at = time.monotonic()
+        if not self.path:
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump({"targets": self.signature, "done": self.done}, f)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
 
 
 def ping_once(ip: str, wait: int = 1) -> bool | None:
     """Return True if host is up, False if down, None if error"""
     try:
         if is_windows:
-            cmd = ["ping", "-n", "1", ip]
+            cmd = ["ping", "-n", "1", "-w", str(wait * 1000), ip]
         else:
             cmd = ["ping", "-c", "1", "-W", str(wait), ip]
         result = subprocess.run(
             cmd,
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL,
+            timeout=wait + 5,
         )
         return True if result.returncode == 0 else False
 
@@ -44,9 +202,238 @@ def ping_once(ip: str, wait: int = 1) -> bool | None:
     except OSError:
         return None
 
+
+def ping_host(ip: str, wait: int = 1, retries: int = 0) -> bool | None:
+    """Ping a host, retrying up to `retries` more times until it answers"""
+    status = ping_once(ip, wait)
+    for _ in range(retries):
+        if status is True:
+            break
+        status = ping_once(ip, wait)
+    return status
+
+
+def sweep(ips, workers=64, wait=1, retries=0):
+    """Ping hosts concurrently, yielding (ip, status) as each one completes.
+
+    At most `workers` pings are in flight and addresses are pulled from `ips`
+    lazily, so memory stays flat even for very large ranges.
+    """
+    ips = iter(ips)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+        while True:
+            for ip in ips:
+                pending[pool.submit(ping_host, ip, wait, retries)] = ip
+                if len(pending) >= workers:
+                    break
+            if not pending:
+                return
+            done, _ = wait_futures(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result(), None
+
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+ICMP_PAYLOAD = b"CSAK" + bytes(52)   # 56 data bytes like ping
+MAX_INFLIGHT = 0x8000   # half the 16-bit sequence space, so in-flight sequences never collide
+
+
+def icmp_checksum(data: bytes) -> int:
+    """Internet checksum (RFC 1071) over an ICMP message"""
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def build_echo(ident: int, seq: int) -> bytes:
+    header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    checksum = icmp_checksum(header + ICMP_PAYLOAD)
+    return struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, checksum, ident, seq) + ICMP_PAYLOAD
+
+
+def open_icmp_socket():
+    """Open an unprivileged ICMP datagram socket, falling back to a raw socket.
+
+    Datagram sockets need net.ipv4.ping_group_range to include our group;
+    raw sockets need root/CAP_NET_RAW. Returns (socket, is_raw).
+    """
+    try:
+        return socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP), False
+    except OSError:
+        return socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP), True
+
+
+def socket_sweep(sock, raw, ips, rate=1000, wait=1, retries=0, max_inflight=None):
+    """Ping hosts from a single ICMP socket, yielding (ip, status, rtt_ms).
+
+    Echo requests are paced at `rate` per second; replies are matched back to
+    hosts by sequence number (and identifier on raw sockets), and requests
+    unanswered after `wait` seconds are retried or reported down. By default
+    up to rate * wait requests are in flight, so dead hosts waiting out their
+    timeout do not hold the send rate back.
+    """
+    sock.setblocking(False)
+    ident = os.getpid() & 0xFFFF
+    interval = 1.0 / rate if rate > 0 else 0.0
+    if max_inflight is None:
+        # 10% headroom for expiry running slightly behind the send schedule
+        max_inflight = int(rate * wait * 1.1) + 1 if rate > 0 else MAX_INFLIGHT
+    max_inflight = max(1, min(max_inflight, MAX_INFLIGHT))
+    ips = iter(ips)
+    retry_queue = deque()   # (ip, attempts)
+    inflight = {}           # seq -> (ip, sent, attempts); insertion order == send order
+    seq = 0
+    exhausted = False
+    next_send = time.monotonic()
+    try:
+        while True:
+            now = time.monotonic()
+
+            # expire unanswered requests, oldest first
+            while inflight:
+                oldest = next(iter(inflight))
+                ip, sent, attempts = inflight[oldest]
+                if now - sent < wait:
+                    break
+                del inflight[oldest]
+                if attempts <= retries:
+                    retry_queue.append((ip, attempts))
+                else:
+                    yield ip, False, None
+
+            # send the next request when the rate allows
+            if now >= next_send and len(inflight) < max_inflight:
+                item = retry_queue.popleft() if retry_queue else None
+                if item is None and not exhausted:
+                    ip = next(ips, None)
+                    if ip is None:
+                        exhausted = True
+                    else:
+                        item = (ip, 0)
+                if item is not None:
+                    ip, attempts = item
+                    seq = (seq + 1) & 0xFFFF
+                    try:
+                        sock.sendto(build_echo(ident, seq), (ip, 0))
+                        inflight[seq] = (ip, time.monotonic(), attempts + 1)
+                    except OSError:
+                        yield ip, None, None
+                    next_send = max(next_send + interval, now - interval)
+                    continue
+
+            if exhausted and not retry_queue and not inflight:
+                return
+
+            # wait for replies until the next send or expiry is due
+            deadlines = []
+            if (retry_queue or not exhausted) and len(inflight) < max_inflight:
+                deadlines.append(next_send)
+            if inflight:
+                deadlines.append(inflight[next(iter(inflight))][1] + wait)
+            timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else wait
+            readable, _, _ = select.select([sock], [], [], timeout)
+            if not readable:
+                continue
+            while True:
+                try:
+                    data, addr = sock.recvfrom(2048)
+                except (BlockingIOError, InterruptedError):
+                    break
+                received = time.monotonic()
+                if raw:
+                    data = data[(data[0] & 0x0F) * 4:]   # strip the IP header
+                if len(data) < 8:
+                    continue
+                icmp_type, _, _, reply_id, reply_seq = struct.unpack("!BBHHH", data[:8])
+                if icmp_type != ICMP_ECHO_REPLY or (raw and reply_id != ident):
+                    continue
+                entry = inflight.get(reply_seq)
+                if entry is None or entry[0] != addr[0]:
+                    continue
+                del inflight[reply_seq]
+                yield entry[0], True, (received - entry[1]) * 1000
+    finally:
+        sock.close()
+
+
+ranges = list(args.range or [])
+excludes = list(args.exclude or [])
+try:
+    if args.range_file:
+        ranges += read_ranges(args.range_file)
+    if args.exclude_file:
+        excludes += read_ranges(args.exclude_file)
+except OSError as e:
+    print(f"{Fore.RED}[-] Failed to read range file: {e}{Style.RESET_ALL}")
+    sys.exit(1)
+if not ranges:
+    parser.error("at least one --range or --range-file is required")
+
 try:
-    for ip in cidr_to_ips(args.range):
-        status = ping_once(ip)
+    targets = build_targets(ranges, excludes)
+except ValueError as e:
+    print(f"{Fore.YELLOW}[!] Invalid CIDR range: {e}{Style.RESET_ALL}")
+    sys.exit(1)
+
+signature = hashlib.sha256(json.dumps(targets).encode()).hexdigest()
+start = Checkpoint.load(args.checkpoint, signature)
+checkpoint = Checkpoint(args.checkpoint, signature, start)
+if start:
+    print(f"{Fore.BLUE}[+] Resuming from checkpoint: {start} addresses already scanned{Style.RESET_ALL}")
+
+# positions of handed-out addresses, so out-of-order results can be checkpointed
+positions = {}
+
+
+def feed():
+    for pos, ip in iter_targets(targets, start):
+        positions[ip] = pos
+        yield ip
+
+
+if args.engine == "socket":
+    if any(version != 4 for version, _, _ in targets):
+        print(f"{Fore.YELLOW}[!] The socket engine only supports IPv4 ranges{Style.RESET_ALL}")
+        sys.exit(1)
+    try:
+        icmp_sock, is_raw = open_icmp_socket()
+    except OSError as e:
+        print(f"{Fore.RED}[-] Cannot open ICMP socket: {e}{Style.RESET_ALL}")
+        sys.exit(1)
+    results = socket_sweep(icmp_sock, is_raw, feed(), args.rate, args.timeout, args.retries, args.max_inflight)
+else:
+    results = sweep(feed(), max(1, args.workers), args.timeout, args.retries)
+
+# Optional output file for live hosts, appended to as hosts are found
+outfile = None
+if args.output == '-':
+    # live hosts alone go to stdout for the next tool; progress moves to stderr
+    outfile = open(sys.stdout.fileno(), 'w', buffering=1, closefd=False)
+    sys.stdout = sys.stderr
+elif args.output:
+    try:
+        if start and os.path.exists(args.output):
+            with open(args.output) as f:
+                live_hosts.update(line.strip() for line in f if line.strip())
+        outfile = open(args.output, 'a' if start else 'w', buffering=1)
+    except OSError as e:
+        print(f"{Fore.RED}[-] Failed to open output file: {e}{Style.RESET_ALL}")
+        sys.exit(1)
+
+# Optional shared results store, so live hosts can be compared across scans
+store = None
+if open_writer is not None:
+    store = open_writer("Network/icmp-rangescan", args.results_db)
+elif args.results_db or os.environ.get("CSAK_RESULTS_DB"):
+    print(f"{Fore.YELLOW}[!] Results store unavailable: put the CSAK directory on PYTHONPATH{Style.RESET_ALL}")
+
+try:
+    for ip, status, rtt in results:
         # Non-verbose: only show up hosts
         if not args.verbose:
             if status is True:
@@ -54,25 +441,46 @@ try:
         # Verbose: show all statuses
         else:
             if status is True:
-                print(f"{Fore.GREEN}[+] {ip}{Style.RESET_ALL}")
+                timing = f" ({rtt:.2f} ms)" if rtt is not None else ""
+                print(f"{Fore.GREEN}[+] {ip}{timing}{Style.RESET_ALL}")
             elif status is False:
                 print(f"{Fore.RED}[-] {ip}{Style.RESET_ALL}")
             else:
                 print(f"{Fore.YELLOW}[!] {ip}{Style.RESET_ALL}")
 
-        if status is True:
-            live_hosts.append(ip)
+        if status is True and ip not in live_hosts:
+            live_hosts.add(ip)
+            if outfile:
+                outfile.write(ip + '\n')
+            if store:
+                store.add("live_host", ip, host=ip, rtt_ms=rtt)
+        checkpoint.complete(positions.pop(ip))
 
-except ValueError:
-    print(f"{Fore.YELLOW}[!] Invalid CIDR range: {args.range}{Style.RESET_ALL}")
+except BrokenPipeError:
+    # the reader of our stdout went away; keep the checkpoint for a resume
+    checkpoint.save()
+    if store:
+        store.close(1)
+    # silence fd 1 only: a real output file keeps the hosts found so far
+    os.dup2(os.open(os.devnull, os.O_WRONLY), 1)
+    if outfile:
+        outfile.close()
     sys.exit(1)
 
-# Optional output file for live hosts
-if args.output:
-    try:
-        with open(args.output, 'w') as f:
-            for ip in live_hosts:
-                f.write(ip + '\n')
-        print(f"{Fore.BLUE}[+] Written {len(live_hosts)} live hosts to {args.output}{Style.RESET_ALL}")
-    except Exception as e:
-        print(f"{Fore.RED}[-] Failed to write output file: {e}{Style.RESET_ALL}")
+except KeyboardInterrupt:
+    checkpoint.save()
+    if outfile:
+        outfile.close()
+    if store:
+        store.close(130)
+    hint = f" (resume with --checkpoint {args.checkpoint})" if args.checkpoint else ""
+    print(f"{Fore.YELLOW}[!] Interrupted after {checkpoint.done} addresses{hint}{Style.RESET_ALL}")
+    sys.exit(130)
+
+checkpoint.clear()
+if store:
+    store.close()
+    print(f"{Fore.BLUE}[+] Recorded {store.count} live hosts in the results store (run {store.run_id}){Style.RESET_ALL}")
+if outfile:
+    outfile.close()
+    print(f"{Fore.BLUE}[+] Written {len(live_hosts)} live hosts to {args.output}{Style.RESET_ALL}")
@@ -1,8 +1,26 @@
 """Scans all SSL certificates on subdomains of s specified domain and then outputs it into a CSV"""
 
 import requests
-import pandas as pd
 import argparse
+import codecs
+import csv
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    from csak.results import open_writer
+except ImportError:  # run outside the CSAK tree: no shared results store
+    open_writer = None
 
 
 # colour vars
@@ -10,39 +28,424 @@ GREEN = "\033[92m"
 RED = "\033[91m"
 RESET = "\033[0m"
 
+CRT_SH_URL = "https://crt.sh/"
+CHUNK_SIZE = 1 << 16
+REQUEST_TIMEOUT = (10, 300)   # connect, read (crt.sh can be slow to start streaming)
+CSV_FIELDS = ['name_value', 'common_name', 'not_before', 'not_after']
+CACHE_PATH = os.path.join(os.environ.get("CSAK_HOME", ".csak"), "certcrawl.db")
+CACHE_FIELDS = ['id', 'issuer_name', 'common_name', 'name_value', 'not_before', 'not_after']
+CACHE_BATCH = 1000
+SPOOL_SIZE = 16 * 1024 * 1024  # new entries kept in memory before spilling to disk
+STDIO = '-'  # -output/-domains value meaning standard output/input
+
+
+def iter_json_array(chunks):
+    """Incrementally decode a JSON array from byte chunks, yielding each element.
+
+    Only the unparsed tail of the body is buffered, so memory depends on the
+    size of one element rather than the whole response.
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buf, pos, started, eof = "", 0, False, False
+    while True:
+        while pos < len(buf) and (buf[pos].isspace() or (started and buf[pos] == ",")):
+            pos += 1
+        if pos < len(buf):
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError("Expected a JSON array from crt.sh")
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                # a bare number ending the buffer may continue in the next chunk
+                if eof or end < len(buf) or isinstance(item, (dict, list)):
+                    yield item
+                    pos = end
+                    continue
+        elif eof:
+            if not started and not buf.strip():
+                return  # empty body: no certificates
+            raise ValueError("Truncated JSON response from crt.sh")
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+            buf = buf[pos:] + text.decode(b"", final=True)
+        else:
+            buf = buf[pos:] + text.decode(chunk)
+        pos = 0
+
 
-def fetch_certificates(domain):
-    url = f"https://crt.sh/?q={domain}&output=json"
-    response = requests.get(url)
+def make_session(retries=3, backoff=1.0, pool_size=10):
+    """Return a pooled Session that retries connection errors and 429/5xx with backoff"""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = "CSAK-certcrawl"
+    return session
+
+class RateLimiter:
+    """Token bucket shared by all worker threads: at most `rate` requests per second"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0
+            self.tokens -= 1
+        if wait:
+            time.sleep(wait)
+
+def fetch_certificates(domain, base_url=CRT_SH_URL, session=None):
+    """Request the crt.sh JSON for a domain and return an iterator over its entries"""
+    response = (session or requests).get(base_url, params={"q": domain, "output": "json"},
+                                         stream=True, timeout=REQUEST_TIMEOUT)
     response.raise_for_status()
-    return response.json()
+
+    def stream():
+        with response:
+            yield from iter_json_array(response.iter_content(CHUNK_SIZE))
+    return stream()
+
+class CertCache:
+    """SQLite cache of crt.sh entries keyed by certificate id.
+
+    Certificates are stored once and linked to every queried domain that
+    returned them; each domain remembers when it was last fetched and the
+    highest id seen, so a refresh only has to write the new entries.
+
+    Safe to share between threads: writes go through one connection under a
+    lock and reads open their own connection (the database is in WAL mode).
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS certificates (
+                id INTEGER PRIMARY KEY,
+                issuer_name TEXT, common_name TEXT, name_value TEXT,
+                not_before TEXT, not_after TEXT
+            );
+            CREATE TABLE IF NOT EXISTS domain_certificates (
+                domain TEXT NOT NULL,
+                id INTEGER NOT NULL REFERENCES certificates(id),
+                PRIMARY KEY (domain, id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS queries (
+                domain TEXT PRIMARY KEY,
+                fetched REAL NOT NULL,
+                max_id INTEGER
+            );
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    def query(self, domain):
+        """Return (fetched, max_id) for a domain, or None if it was never fetched"""
+        with self.lock:
+            return self.conn.execute("SELECT fetched, max_id FROM queries WHERE domain = ?", (domain,)).fetchone()
+
+    def is_fresh(self, domain, ttl):
+        query = self.query(domain)
+        return query is not None and time.time() - query[0] < ttl
+
+    def merge(self, domain, certificates):
+        """Store entries newer than the domain's highest cached id; returns how many were added.
+
+        New entries are spooled while downloading and written afterwards in a
+        single transaction, so other threads are not blocked on the network
+        and an interrupted download leaves the cache untouched.
+        """
+        query = self.query(domain)
+        max_id = query[1] if query else None
+        with tempfile.SpooledTemporaryFile(SPOOL_SIZE, mode='w+', encoding='utf-8') as spool:
+            for cert in certificates:
+                cert_id = cert.get('id')
+                if not isinstance(cert_id, int) or (max_id is not None and cert_id <= max_id):
+                    continue
+                spool.write(json.dumps([cert.get(f) for f in CACHE_FIELDS]) + '\n')
+            spool.seek(0)
+            with self.lock, self.conn:
+                return self._store(domain, (json.loads(line) for line in spool))
+
+    def _store(self, domain, rows):
+        added, batch = 0, []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= CACHE_BATCH:
+                added += self._insert(domain, batch)
+                batch = []
+        added += self._insert(domain, batch)
+        self.conn.execute(
+            "INSERT INTO queries (domain, fetched, max_id) "
+            "SELECT ?, ?, MAX(id) FROM domain_certificates WHERE domain = ? "
+            "ON CONFLICT(domain) DO UPDATE SET fetched = excluded.fetched, max_id = excluded.max_id",
+            (domain, time.time(), domain),
+        )
+        return added
+
+    def _insert(self, domain, rows):
+        if not rows:
+            return 0
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO certificates ({', '.join(CACHE_FIELDS)}) "
+            f"VALUES ({', '.join('?' * len(CACHE_FIELDS))})",
+            rows,
+        )
+        before = self.conn.total_changes
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO domain_certificates (domain, id) VALUES (?, ?)",
+            ((domain, row[0]) for row in rows),
+        )
+        return self.conn.total_changes - before
+
+    def certificates(self, domain):
+        """Iterate the cached entries for a domain as dicts"""
+        conn = sqlite3.connect(self.path, timeout=60)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield from map(dict, conn.execute(
+                f"SELECT {', '.join('c.' + f for f in CACHE_FIELDS)} FROM certificates c "
+                "JOIN domain_certificates d ON d.id = c.id WHERE d.domain = ?",
+                (domain,),
+            ))
+        finally:
+            conn.close()
+
+def load_certificates(domain, base_url=CRT_SH_URL, session=None, cache=None,
+                      ttl=0, offline=False, refresh=False, limiter=None):
+    """Return an iterator over a domain's certificates, going through the cache if one is given.
+
+    Cached data younger than ttl seconds is served without touching the
+    network; offline serves whatever is cached and fails if nothing is.
+    """
+    if cache is None:
+        if offline:
+            raise LookupError("Offline mode needs the certificate cache")
+        if limiter:
+            limiter.acquire()
+        return fetch_certificates(domain, base_url, session)
+    if offline:
+        if cache.query(domain) is None:
+            raise LookupError(f"No cached certificates for {domain}")
+    elif refresh or not cache.is_fresh(domain, ttl):
+        if limiter:
+            limiter.acquire()
+        added = cache.merge(domain, fetch_certificates(domain, base_url, session))
+        print(f"Cached {added} new certificate(s) for {domain}")
+    return cache.certificates(domain)
 
 def process_certificates(certificates):
-    df = pd.DataFrame(certificates)
-    df['not_before'] = pd.to_datetime(df['not_before'])
-    latest_certs = df.sort_values('not_before', ascending=False).drop_duplicates(subset=['name_value'])
-    return latest_certs[['name_value', 'common_name', 'not_before', 'not_after']]
+    """Keep only the newest certificate per name, one name at a time.
+
+    Multi-line name_value fields (several SANs) are split so each name is
+    tracked on its own. Returns the kept entries, newest first.
+    """
+    latest = {}
+    for cert in certificates:
+        not_before = cert.get('not_before') or ''
+        rank = (not_before, cert.get('id') or 0)
+        for name in str(cert.get('name_value') or '').splitlines():
+            name = name.strip()
+            if not name:
+                continue
+            current = latest.get(name)
+            if current is None or rank > current['_rank']:
+                latest[name] = {
+                    'name_value': name,
+                    'common_name': cert.get('common_name'),
+                    'not_before': not_before,
+                    'not_after': cert.get('not_after'),
+                    '_rank': rank,
+                }
+    return sorted(latest.values(), key=lambda c: c['_rank'], reverse=True)
+
+def format_timestamp(value):
+    """Render crt.sh's ISO timestamps as 'YYYY-MM-DD HH:MM:SS' like the CSV always had"""
+    try:
+        return str(datetime.fromisoformat(value))
+    except (TypeError, ValueError):
+        return value
+
+def csv_writer(f, with_domain=False):
+    """Return a DictWriter with the header written, optionally with a leading domain column"""
+    writer = csv.DictWriter(f, fieldnames=(['domain'] if with_domain else []) + CSV_FIELDS,
+                            extrasaction='ignore')
+    writer.writeheader()
+    return writer
+
+def write_rows(writer, latest_certs, domain=None):
+    for cert in latest_certs:
+        row = dict(cert, not_before=format_timestamp(cert['not_before']))
+        if domain is not None:
+            row['domain'] = domain
+        writer.writerow(row)
+
+def write_csv(latest_certs, output):
+    """Write the kept certificates to CSV row by row"""
+    with open(output, 'w', newline='', encoding='utf-8') as f:
+        write_rows(csv_writer(f), latest_certs)
+
+def record_results(store, latest_certs, domain):
+    """Add the kept certificate names to the shared results store"""
+    for cert in latest_certs:
+        name = cert['name_value']
+        store.add('certificate', name, host=name.removeprefix('*.'), domain=domain,
+                  common_name=cert['common_name'], not_before=format_timestamp(cert['not_before']),
+                  not_after=cert['not_after'])
+
+def read_domains(path):
+    """Read one domain per line ('-' for standard input), skipping blank lines and # comments"""
+    with (open(0, 'r', encoding='utf-8', closefd=False) if path == STDIO else open(path, 'r', encoding='utf-8')) as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+def domain_filename(domain):
+    """File name for a domain's CSV in -output-dir mode ('%.example.com' -> '_.example.com.csv')"""
+    return re.sub(r'[^\w.-]', '_', domain) + '.csv'
+
+def crawl_domain(domain, args, session, cache, limiter):
+    """Fetch and reduce one domain's certificates; writes its own CSV in -output-dir mode"""
+    certificates = load_certificates(domain, args.base_url, session, cache, args.ttl * 3600,
+                                     args.offline, args.refresh, limiter)
+    latest_certs = process_certificates(certificates)
+    if args.output_dir:
+        write_csv(latest_certs, os.path.join(args.output_dir, domain_filename(domain)))
+    return latest_certs
 
 def main():
     parser = argparse.ArgumentParser(description="Enumerate all subdomain certificates for a given domain.")
-    parser.add_argument("-domain", type=str, help="Enter the domain to enumerate certificates for.", default=None, required=True)
-    parser.add_argument("-output", type=str, help="CSV output path, e.g., C:\\tmp\\output.csv", default=None, required=True)
+    parser.add_argument("-domain", type=str, nargs='+', action='extend', help="Enter the domain(s) to enumerate certificates for.", default=None)
+    parser.add_argument("-domains", type=str, help="File with one domain per line to enumerate in batch ('-' for standard input).", default=None)
+    parser.add_argument("-output", type=str, help="CSV output path, e.g., C:\\tmp\\output.csv, or '-' for standard output (batch runs add a domain column).", default=None)
+    parser.add_argument("-output-dir", type=str, help="Directory for one CSV per domain instead of (or as well as) a merged -output.", default=None)
+    parser.add_argument("-workers", type=int, help="Domains fetched concurrently (default: 4).", default=4)
+    parser.add_argument("-rate", type=float, help="Global limit on requests per second to crt.sh, 0 for none (default: 1).", default=1.0)
+    parser.add_argument("-base-url", type=str, help="Certificate search endpoint (default: https://crt.sh/).", default=CRT_SH_URL)
+    parser.add_argument("-cache-db", type=str, help=f"SQLite certificate cache (default: {CACHE_PATH}).", default=CACHE_PATH)
+    parser.add_argument("-ttl", type=float, help="Hours before cached results are refreshed from crt.sh (default: 24).", default=24)
+    parser.add_argument("-refresh", action="store_true", help="Refresh from crt.sh even if the cache is within its TTL.")
+    parser.add_argument("-offline", action="store_true", help="Serve results from the cache only, without network access.")
+    parser.add_argument("-no-cache", action="store_true", help="Bypass the cache and always download the full history.")
+    parser.add_argument("-retries", type=int, help="Retries with exponential backoff for failed requests (default: 3).", default=3)
+    parser.add_argument("-results-db", type=str, help="Also record the names in this CSAK results database (default: $CSAK_RESULTS_DB).", default=None)
     args = parser.parse_args()
-    
 
-    if args.domain is None and args.output is None:
+    domains = list(args.domain or [])
+    if args.domains:
+        try:
+            domains += read_domains(args.domains)
+        except OSError as e:
+            print(f"{RED}Error: Could not read domain list: {e}{RESET}")
+            return 1
+    domains = list(dict.fromkeys(domains))
+    has_output = args.output is not None or args.output_dir is not None
+
+    if not domains and not has_output:
         print("Error: Please specify the domain and output CSV path. See help for usage.")
-    elif args.domain is None:
+        return 1
+    elif not domains:
         print("Error: Domain must be specified. See help for usage.")
-        return
-    elif args.output is None:
+        return 1
+    elif not has_output:
         print("Error: Output CSV path must be specified. See help for usage")
-        return
+        return 1
+    if args.offline and args.no_cache:
+        print(f"{RED}Error: -offline cannot be combined with -no-cache.{RESET}")
+        return 1
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    # a domain column is only added when results from several domains are merged
+    batch = len(domains) > 1 or args.domains is not None
+    workers = max(1, min(args.workers, len(domains)))
+    cache = None if args.no_cache else CertCache(args.cache_db)
+    limiter = RateLimiter(args.rate)
+    failed = []
+    if args.output == STDIO:
+        merged = open(sys.stdout.fileno(), 'w', newline='', encoding='utf-8', closefd=False)
+        sys.stdout = sys.stderr  # status messages must not mix with the CSV
+    else:
+        merged = open(args.output, 'w', newline='', encoding='utf-8') if args.output else None
+    store = None
+    if open_writer is not None:
+        store = open_writer("PKI/certcrawl", args.results_db)
+    elif args.results_db or os.environ.get("CSAK_RESULTS_DB"):
+        print(f"{RED}Warning: results store unavailable, put the CSAK directory on PYTHONPATH{RESET}")
+    status = 1
+    try:
+        writer = csv_writer(merged, with_domain=batch) if merged else None
+        with make_session(args.retries, pool_size=workers) as session, ThreadPoolExecutor(workers) as pool:
+            futures = [(d, pool.submit(crawl_domain, d, args, session, cache, limiter)) for d in domains]
+            # results are written in input order as they become available
+            for domain, future in futures:
+                try:
+                    latest_certs = future.result()
+                except BrokenPipeError:
+                    raise  # our own stdout closed, not a problem with this domain
+                except (requests.RequestException, sqlite3.Error, ValueError, LookupError, OSError) as e:
+                    failed.append(domain)
+                    print(f"{RED}Error: {domain}: {e}{RESET}")
+                    continue
+                if writer:
+                    write_rows(writer, latest_certs, domain if batch else None)
+                if store:
+                    record_results(store, latest_certs, domain)
+                if batch:
+                    print(f"{domain}: {len(latest_certs)} name(s)")
+        status = 1 if failed else 0
+    except BrokenPipeError:
+        # whoever read our standard output has gone away; only fd 1 is
+        # silenced so a CSV written to a file is still flushed when closed
+        os.dup2(os.open(os.devnull, os.O_WRONLY), 1)
+        return 1
+    finally:
+        if merged:
+            merged.close()
+        if cache is not None:
+            cache.close()
+        if store:
+            store.close(status)
+
+    if len(failed) == len(domains):
+        return 1
+    destination = ", ".join(filter(None, [args.output, args.output_dir]))
+    if batch:
+        print(f"{GREEN}Certificates for {len(domains) - len(failed)} of {len(domains)} domain(s) have successfully exported to: {destination}{RESET}\n")
     else:
-        certificates = fetch_certificates(args.domain)
-        latest_certs = process_certificates(certificates)
-        latest_certs.to_csv(args.output, index=False)
-        print(f"{GREEN}Certificates belonging to subdomains of {args.domain} have successfully exported to the following file: {args.output}{RESET}\n")
+        print(f"{GREEN}Certificates belonging to subdomains of {domains[0]} have successfully exported to the following file: {destination}{RESET}\n")
+    return 1 if failed else 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())